@@ -0,0 +1,309 @@
+# stdlib
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, List
+
+# third party
+import httpx
+import streamlit as st
+
+# first party
+from client import (
+    CONNECT_TIMEOUT,
+    DEFAULT_POLLING,
+    HTTP2,
+    POOL_MAXSIZE,
+    READ_TIMEOUT,
+    ConnAttr,
+    PollingStrategy,
+    SemanticLayerError,
+    _transport_key,
+)
+from poller import get_status_poller
+from queries import GRAPHQL_QUERIES
+
+
+class AsyncSemanticLayerClient:
+    """asyncio client for the Semantic Layer GraphQL API.
+
+    Payloads have the same shape as the ones built from `GRAPHQL_QUERIES` for
+    `client.submit_request`, so any page can switch between the two.
+    """
+
+    def __init__(
+        self,
+        conn: ConnAttr,
+        *,
+        source: str = None,
+        max_connections: int = POOL_MAXSIZE,
+        http2: bool = HTTP2,
+        polling: PollingStrategy = DEFAULT_POLLING,
+        multiplex: bool = True,
+    ):
+        self.conn = conn
+        self.source = source or "streamlit"
+        self.polling = polling
+        self.multiplex = multiplex
+        try:
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(max_connections=max_connections),
+                timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            )
+        except ImportError:
+            # `h2` isn't installed
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections),
+                timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            )
+
+    async def submit(
+        self,
+        payload: Dict,
+        *,
+        source: str = None,
+        host_override: str = None,
+        path: str = "/api/graphql",
+    ) -> Dict:
+        url = f"{host_override or self.conn.host}{path}"
+        payload = {**payload, "variables": dict(payload.get("variables") or {})}
+        payload["variables"]["environmentId"] = self.conn.params["environmentid"]
+        r = await self._client.post(
+            url,
+            json=payload,
+            headers={
+                "Authorization": self.conn.auth_header,
+                "x-dbt-partner-source": source or self.source,
+            },
+        )
+        return r.json()
+
+    async def create_query(
+        self, payload: Dict, key: str = "createQuery", source: str = None
+    ) -> str:
+        json = await self.submit(payload, source=source)
+        try:
+            return json["data"][key]["queryId"]
+        except (KeyError, TypeError):
+            raise SemanticLayerError(_error_message(json))
+
+    async def poll(self, query_id: str) -> Dict:
+        if self.multiplex:
+            pending = get_status_poller().submit(self.conn, query_id)
+            return await asyncio.wrap_future(pending.future)
+
+        payload = {
+            "query": GRAPHQL_QUERIES["get_results"],
+            "variables": {"queryId": query_id},
+        }
+        intervals = self.polling.intervals()
+        while True:
+            await asyncio.sleep(next(intervals))
+            json = await self.submit(payload)
+            try:
+                data = json["data"]["query"]
+            except (KeyError, TypeError):
+                raise SemanticLayerError(_error_message(json))
+
+            status = data["status"].lower()
+            if status == "successful":
+                return data
+            elif status == "failed":
+                raise SemanticLayerError(data["error"])
+
+    async def get_query_results(
+        self, payload: Dict, key: str = "createQuery", source: str = None
+    ) -> Dict:
+        query_id = await self.create_query(payload, key=key, source=source)
+        return await self.poll(query_id)
+
+    async def gather_query_results(
+        self,
+        payloads: List[Dict],
+        key: str = "createQuery",
+        source: str = None,
+        return_exceptions: bool = False,
+    ) -> List[Dict]:
+        """Submit every payload at once and wait for all of them to finish."""
+        return await asyncio.gather(
+            *[self.get_query_results(p, key=key, source=source) for p in payloads],
+            return_exceptions=return_exceptions,
+        )
+
+    async def dimension_values(self, dimension: str, metrics: List[str] = None) -> Dict:
+        payload = {
+            "query": GRAPHQL_QUERIES["dimension_values"],
+            "variables": {
+                "groupBy": [{"name": dimension}],
+                "metrics": [{"name": m} for m in metrics or []],
+            },
+        }
+        return await self.get_query_results(payload, key="createDimensionValuesQuery")
+
+    async def dimension_values_page(
+        self,
+        dimension: str,
+        limit: int,
+        prefix: str = None,
+        after: Any = None,
+    ) -> Dict:
+        """One page of a dimension's values in ascending order.
+
+        `prefix` pushes a LIKE filter into the query and `after` continues from
+        the last value of the previous page (keyset paging).
+        """
+        column = f"{{{{ Dimension('{dimension}') }}}}"
+        where = []
+        if prefix:
+            pattern = _sql_literal(_like_escape(prefix) + "%")
+            where.append({"sql": f"{column} LIKE {pattern} ESCAPE '{LIKE_ESCAPE}'"})
+        if after is not None:
+            where.append({"sql": f"{column} > {_sql_literal(after)}"})
+        payload = {
+            "query": GRAPHQL_QUERIES["dimension_values_page"],
+            "variables": {
+                "groupBy": [{"name": dimension}],
+                "where": where,
+                "orderBy": [{"groupBy": {"name": dimension}}],
+                "limit": limit,
+            },
+        }
+        return await self.get_query_results(payload)
+
+    async def gather_dimension_values(
+        self,
+        dimensions: List[str],
+        metrics: List[str] = None,
+        return_exceptions: bool = False,
+    ) -> List[Dict]:
+        """Fetch values for several dimensions concurrently."""
+        return await asyncio.gather(
+            *[self.dimension_values(d, metrics) for d in dimensions],
+            return_exceptions=return_exceptions,
+        )
+
+    async def metrics(self) -> List[Dict]:
+        json = await self.submit({"query": GRAPHQL_QUERIES["metrics"]})
+        try:
+            return json["data"]["metrics"]
+        except (KeyError, TypeError):
+            raise SemanticLayerError(_error_message(json))
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+# Not a backslash, which some warehouses also treat as a string escape
+LIKE_ESCAPE = "!"
+
+
+def _like_escape(text: str) -> str:
+    """Match `text` literally in a LIKE pattern escaped with `LIKE_ESCAPE`."""
+    for char in (LIKE_ESCAPE, "%", "_"):
+        text = text.replace(char, LIKE_ESCAPE + char)
+    return text
+
+
+def _sql_literal(value: Any) -> str:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _error_message(json: Dict) -> str:
+    try:
+        return json["errors"][0]["message"]
+    except (KeyError, IndexError, TypeError):
+        return "Unknown error returned from the Semantic Layer API"
+
+
+class _LoopThread:
+    """Event loop running forever in a daemon thread.
+
+    Streamlit runs each script on its own thread, so coroutines are scheduled
+    here instead; that keeps async clients (and their connection pools) bound
+    to a single loop for the life of the process.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="sl-event-loop", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, coro: Coroutine) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: float = None) -> Any:
+        return self.submit(coro).result(timeout)
+
+
+@st.cache_resource(show_spinner=False)
+def get_event_loop() -> _LoopThread:
+    return _LoopThread()
+
+
+class SyncSemanticLayerClient:
+    """Blocking facade over `AsyncSemanticLayerClient` for use in page scripts."""
+
+    def __init__(self, conn: ConnAttr, **kwargs):
+        self._runner = get_event_loop()
+        self.client = self._runner.run(self._create(conn, **kwargs))
+
+    @staticmethod
+    async def _create(conn: ConnAttr, **kwargs) -> AsyncSemanticLayerClient:
+        # Create the underlying httpx client on the loop that will use it
+        return AsyncSemanticLayerClient(conn, **kwargs)
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine of the async client without waiting on it."""
+        return self._runner.submit(coro)
+
+    def get_query_results(
+        self, payload: Dict, key: str = "createQuery", source: str = None
+    ) -> Dict:
+        return self._runner.run(
+            self.client.get_query_results(payload, key=key, source=source)
+        )
+
+    def get_query_results_many(
+        self,
+        payloads: List[Dict],
+        key: str = "createQuery",
+        source: str = None,
+        return_exceptions: bool = False,
+    ) -> List[Dict]:
+        return self._runner.run(
+            self.client.gather_query_results(
+                payloads, key=key, source=source, return_exceptions=return_exceptions
+            )
+        )
+
+    def dimension_values(self, dimension: str, metrics: List[str] = None) -> Dict:
+        return self._runner.run(self.client.dimension_values(dimension, metrics))
+
+    def dimension_values_page(
+        self, dimension: str, limit: int, prefix: str = None, after: Any = None
+    ) -> Dict:
+        return self._runner.run(
+            self.client.dimension_values_page(dimension, limit, prefix, after)
+        )
+
+    def metrics(self) -> List[Dict]:
+        return self._runner.run(self.client.metrics())
+
+
+@st.cache_resource(show_spinner=False)
+def _get_sync_client(
+    host: str, token_hash: str, environment_id: str, _conn: ConnAttr
+) -> SyncSemanticLayerClient:
+    return SyncSemanticLayerClient(_conn)
+
+
+def get_sync_client(conn: ConnAttr = None) -> SyncSemanticLayerClient:
+    """Return the process-wide client for a connection."""
+    conn = conn or st.session_state.conn
+    return _get_sync_client(*_transport_key(conn), conn.params["environmentid"], conn)
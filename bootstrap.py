@@ -0,0 +1,128 @@
+# stdlib
+import os
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+# third party
+import streamlit as st
+
+# first party
+from client import ConnAttr, submit_request
+from helpers import url_for_disco
+from queries import GRAPHQL_QUERIES
+
+BOOTSTRAP_WORKERS = int(os.environ.get("DBT_SL_BOOTSTRAP_WORKERS", 4))
+
+
+def fetch_saved_queries(conn: ConnAttr) -> List[Dict]:
+    payload = {"query": GRAPHQL_QUERIES["saved_queries"]}
+    json_data = submit_request(conn, payload)
+    return (json_data.get("data") or {}).get("savedQueries") or []
+
+
+def fetch_account(conn: ConnAttr) -> Optional[Tuple[int, int]]:
+    """Account and project ids from the Discovery API, if they can be found."""
+    host = url_for_disco(conn)
+    payload = {"query": GRAPHQL_QUERIES["account"], "variables": {"first": 1}}
+
+    # TODO: Temporary hack to get around multi-cell metadata URLs not conforming
+    try:
+        json_data = submit_request(
+            conn, payload, host_override=host, path="/beta/graphql"
+        )
+    except Exception as e:
+        print(f"Error running disco API query for {host}; {e}")
+        return None
+
+    try:
+        edges = (
+            json_data.get("data", {})
+            .get("environment", {})
+            .get("applied", {})
+            .get("models", {})
+            .get("edges", [])
+        )
+    except AttributeError:
+        # data is None
+        return None
+
+    if not edges:
+        return None
+
+    return edges[0]["node"]["accountId"], edges[0]["node"]["projectId"]
+
+
+def build_vector_index(metrics: List[Dict], environment: str = None):
+    # Imported here so pages that only sync the bootstrap don't pay for langchain
+    from llm.semantic_layer_docs import build_vector_index
+
+    return build_vector_index(metrics, environment)
+
+
+def _apply_saved_queries(saved_queries: List[Dict]):
+    if saved_queries:
+        st.session_state.saved_queries = saved_queries
+
+
+def _apply_account(account: Optional[Tuple[int, int]]):
+    if account is not None:
+        st.session_state.account_id, st.session_state.project_id = account
+
+
+def _apply_vector_index(db):
+    st.session_state.db = db
+
+
+APPLY: Dict[str, Callable] = {
+    "saved_queries": _apply_saved_queries,
+    "account": _apply_account,
+    "db": _apply_vector_index,
+}
+
+
+@st.cache_resource(show_spinner=False)
+def get_bootstrap_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=BOOTSTRAP_WORKERS, thread_name_prefix="sl-bootstrap"
+    )
+
+
+def start_task(name: str, fn: Callable, *args) -> Future:
+    """Run one bootstrap step in the background; `sync_bootstrap` applies it."""
+    future = get_bootstrap_executor().submit(fn, *args)
+    st.session_state.setdefault("bootstrap", {})[name] = future
+    return future
+
+
+def start_bootstrap(conn: ConnAttr):
+    """Start the steps that don't depend on the metrics catalog."""
+    start_task("saved_queries", fetch_saved_queries, conn)
+    start_task("account", fetch_account, conn)
+
+
+def sync_bootstrap(wait_for: List[str] = None) -> List[str]:
+    """Apply finished bootstrap steps to the session.
+
+    Call at the top of a page; steps named in `wait_for` are waited on first.
+    Returns the names of the steps applied.
+    """
+    tasks: Dict[str, Future] = st.session_state.get("bootstrap", {})
+    pending = [tasks[name] for name in wait_for or [] if name in tasks]
+    if pending:
+        wait(pending)
+
+    applied = []
+    for name, future in list(tasks.items()):
+        if not future.done():
+            continue
+
+        del tasks[name]
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Error running bootstrap step {name}; {e}")
+            continue
+
+        APPLY[name](result)
+        applied.append(name)
+    return applied
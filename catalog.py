@@ -0,0 +1,168 @@
+# stdlib
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# third party
+import streamlit as st
+
+# first party
+from client import ConnAttr, SemanticLayerError, submit_request
+from queries import GRAPHQL_QUERIES
+from result_cache import CACHE_DIR, environment_key
+
+
+def catalog_hash(metrics: List[Dict]) -> str:
+    content = json.dumps(metrics, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def fetch_catalog(conn: ConnAttr) -> List[Dict]:
+    """Download the full metrics catalog (every dimension of every metric)."""
+    json_data = submit_request(conn, {"query": GRAPHQL_QUERIES["metrics"]})
+    try:
+        return json_data["data"]["metrics"]
+    except (KeyError, TypeError):
+        # `data` is None and there may be an error
+        try:
+            raise SemanticLayerError(json_data["errors"][0]["message"])
+        except (KeyError, IndexError, TypeError):
+            raise SemanticLayerError(None)
+
+
+class CatalogStore:
+    """Metrics catalogs persisted on disk per environment, with a content hash."""
+
+    def __init__(self, directory: str = os.path.join(CACHE_DIR, "catalogs")):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, conn: ConnAttr) -> str:
+        key = hashlib.sha256(environment_key(conn).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, conn: ConnAttr) -> Optional[Tuple[List[Dict], str]]:
+        try:
+            with open(self._path(conn)) as f:
+                data = json.load(f)
+            metrics, content_hash = data["metrics"], data["hash"]
+            # Check what `apply_catalog` reads, so a bad file fails here
+            for metric in metrics:
+                metric["name"], [d["name"] for d in metric["dimensions"]]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            # Missing or from an older layout, fetch it again
+            return None
+
+        return metrics, content_hash
+
+    def save(self, conn: ConnAttr, metrics: List[Dict]) -> str:
+        content_hash = catalog_hash(metrics)
+        path = self._path(conn)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"hash": content_hash, "metrics": metrics}, f)
+        os.replace(tmp_path, path)
+        return content_hash
+
+
+class CatalogRevalidator:
+    """Refreshes stored catalogs in the background, one request per environment."""
+
+    def __init__(
+        self, store: CatalogStore, min_interval: float = 60, max_workers: int = 2
+    ):
+        self.store = store
+        self.min_interval = min_interval
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="sl-catalog"
+        )
+        self._lock = threading.Lock()
+        # environment -> (future, time submitted)
+        self._in_flight: Dict[str, Tuple[Future, float]] = {}
+
+    def revalidate(self, conn: ConnAttr) -> Future:
+        """Return a future resolving to `(metrics, hash)` of the latest catalog."""
+        key = environment_key(conn)
+        with self._lock:
+            future, submitted = self._in_flight.get(key, (None, 0))
+            # Reuse a refresh that is running or finished very recently
+            if future is None or (
+                future.done() and time.monotonic() - submitted > self.min_interval
+            ):
+                future = self._executor.submit(self._refresh, conn)
+                self._in_flight[key] = (future, time.monotonic())
+        return future
+
+    def _refresh(self, conn: ConnAttr) -> Tuple[List[Dict], str]:
+        metrics = fetch_catalog(conn)
+        stored = self.store.load(conn)
+        content_hash = catalog_hash(metrics)
+        if stored is None or stored[1] != content_hash:
+            self.store.save(conn, metrics)
+        return metrics, content_hash
+
+
+@st.cache_resource(show_spinner=False)
+def get_catalog_store() -> CatalogStore:
+    return CatalogStore()
+
+
+@st.cache_resource(show_spinner=False)
+def get_catalog_revalidator() -> CatalogRevalidator:
+    return CatalogRevalidator(get_catalog_store())
+
+
+def apply_catalog(metrics: List[Dict], content_hash: str):
+    """Load a catalog into the session (`metric_dict`, `dimension_dict`, ...)."""
+    from bootstrap import build_vector_index, start_task
+    from catalog_index import get_catalog_index
+    from dimension_values import warm_dimension_values
+
+    metrics = copy.deepcopy(metrics)
+    # Embedding is slow, so build the index in the background from its own copy
+    # (dimensions are rewritten below); `sync_bootstrap` sets `db` when it's done
+    start_task(
+        "db",
+        build_vector_index,
+        copy.deepcopy(metrics),
+        environment_key(st.session_state.conn),
+    )
+    st.session_state.metric_dict = {m["name"]: m for m in metrics}
+    st.session_state.dimension_dict = {
+        dim["name"]: dim for metric in metrics for dim in metric["dimensions"]
+    }
+    for metric in st.session_state.metric_dict:
+        st.session_state.metric_dict[metric]["dimensions"] = [
+            d["name"] for d in st.session_state.metric_dict[metric]["dimensions"]
+        ]
+    st.session_state.catalog_hash = content_hash
+    warm_dimension_values(st.session_state.conn, get_catalog_index())
+
+
+def sync_catalog() -> bool:
+    """Swap in a revalidated catalog if one finished and its content changed.
+
+    Call at the top of a page; returns True when the session catalog changed.
+    """
+    future = st.session_state.get("catalog_refresh")
+    if future is None or not future.done():
+        return False
+
+    del st.session_state["catalog_refresh"]
+    try:
+        metrics, content_hash = future.result()
+    except Exception as e:
+        # Keep serving the stored catalog
+        print(f"Error revalidating metrics catalog; {e}")
+        return False
+
+    if content_hash == st.session_state.get("catalog_hash") or not metrics:
+        return False
+
+    apply_catalog(metrics, content_hash)
+    return True
@@ -0,0 +1,147 @@
+# stdlib
+from typing import Dict, Iterable, List
+
+# third party
+import streamlit as st
+
+TIME_LENGTHS = {"day": 1, "week": 7, "month": 30, "quarter": 90, "year": 365}
+
+
+def _bit_ids(bits: int) -> Iterable[int]:
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class CatalogIndex:
+    """Bitset index over a metrics catalog.
+
+    Metrics, dimensions and grains get integer ids in sorted order, and each
+    metric stores the set of its dimensions (and grains) as an int bitset, so
+    compatibility lookups are a handful of bitwise ANDs and set bits come back
+    already sorted.
+    """
+
+    def __init__(self, metric_dict: Dict[str, Dict], dimension_dict: Dict[str, Dict]):
+        self.metrics = sorted(metric_dict)
+        self.dimensions = sorted(
+            set(dimension_dict).union(*[m["dimensions"] for m in metric_dict.values()])
+        )
+        self.grains = sorted(
+            {
+                g.strip().lower()
+                for m in metric_dict.values()
+                for g in m["queryableGranularities"]
+            },
+            key=lambda g: (TIME_LENGTHS.get(g, 0), g),
+        )
+        self.metric_ids = {name: i for i, name in enumerate(self.metrics)}
+        self.dimension_ids = {name: i for i, name in enumerate(self.dimensions)}
+        grain_ids = {name: i for i, name in enumerate(self.grains)}
+
+        self.metric_dimensions = [0] * len(self.metrics)
+        self.dimension_metrics = [0] * len(self.dimensions)
+        self.metric_grains = [0] * len(self.metrics)
+        self.requires_metric_time_bits = 0
+        for name, metric in metric_dict.items():
+            metric_id = self.metric_ids[name]
+            for dimension in metric["dimensions"]:
+                dimension_id = self.dimension_ids[dimension]
+                self.metric_dimensions[metric_id] |= 1 << dimension_id
+                self.dimension_metrics[dimension_id] |= 1 << metric_id
+            for grain in metric["queryableGranularities"]:
+                self.metric_grains[metric_id] |= 1 << grain_ids[grain.strip().lower()]
+            if metric["requiresMetricTime"]:
+                self.requires_metric_time_bits |= 1 << metric_id
+
+        self.dimension_types = {
+            name: (
+                dimension_dict[name]["type"].upper()
+                if name in dimension_dict
+                else "TIME"
+            )
+            for name in self.dimensions
+        }
+        self.time_dimension_bits = 0
+        for name, dimension_type in self.dimension_types.items():
+            if dimension_type == "TIME":
+                self.time_dimension_bits |= 1 << self.dimension_ids[name]
+
+    # Names missing from the index (e.g. selections made before the catalog was
+    # refreshed) are treated as compatible with nothing.
+
+    def _metric_bits(self, metrics: Iterable[str]) -> int:
+        bits = 0
+        for metric in metrics:
+            if metric in self.metric_ids:
+                bits |= 1 << self.metric_ids[metric]
+        return bits
+
+    def _dimension_bits(self, dimensions: Iterable[str]) -> int:
+        bits = 0
+        for dimension in dimensions:
+            if dimension in self.dimension_ids:
+                bits |= 1 << self.dimension_ids[dimension]
+        return bits
+
+    def compatible_dimensions(self, metrics: List[str]) -> List[str]:
+        """Sorted dimensions shared by every selected metric."""
+        if len(metrics) == 0:
+            return []
+
+        bits = -1
+        for metric in metrics:
+            metric_id = self.metric_ids.get(metric)
+            bits &= 0 if metric_id is None else self.metric_dimensions[metric_id]
+        return [self.dimensions[i] for i in _bit_ids(bits)]
+
+    def compatible_metrics(self, dimensions: List[str]) -> List[str]:
+        """Sorted metrics that can be grouped by every selected dimension."""
+        bits = (1 << len(self.metrics)) - 1
+        for dimension in dimensions:
+            dimension_id = self.dimension_ids.get(dimension)
+            bits &= 0 if dimension_id is None else self.dimension_metrics[dimension_id]
+        return [self.metrics[i] for i in _bit_ids(bits)]
+
+    def common_dimensions(self) -> List[str]:
+        """Sorted dimensions shared by every metric in the catalog."""
+        return self.compatible_dimensions(self.metrics)
+
+    def requires_metric_time(self, metrics: List[str]) -> bool:
+        return bool(self._metric_bits(metrics) & self.requires_metric_time_bits)
+
+    def has_time_dimension(self, dimensions: List[str]) -> bool:
+        return bool(self._dimension_bits(dimensions) & self.time_dimension_bits)
+
+    def dimension_type(self, dimension: str) -> str:
+        return self.dimension_types.get(dimension, "TIME")
+
+    def shared_grains(self, metrics: List[str]) -> List[str]:
+        """Grains queryable by every selected metric, shortest first."""
+        if len(metrics) == 0:
+            return []
+
+        bits = -1
+        for metric in metrics:
+            metric_id = self.metric_ids.get(metric)
+            bits &= 0 if metric_id is None else self.metric_grains[metric_id]
+        return [self.grains[i] for i in _bit_ids(bits)]
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _build_catalog_index(
+    content_hash: str, _metric_dict: Dict, _dimension_dict: Dict
+) -> CatalogIndex:
+    return CatalogIndex(_metric_dict, _dimension_dict)
+
+
+def get_catalog_index() -> CatalogIndex:
+    """Index for the session's catalog, built once per catalog version."""
+    state = st.session_state
+    if state.get("catalog_hash") is None:
+        return CatalogIndex(state.metric_dict, state.dimension_dict)
+
+    return _build_catalog_index(
+        state.catalog_hash, state.metric_dict, state.dimension_dict
+    )
@@ -1,6 +1,10 @@
+# stdlib
+from typing import Dict, List
+
 # third party
-import pandas as pd
 import plotly.express as px
+import pyarrow as pa
+import pyarrow.compute as pc
 import streamlit as st
 
 # first party
@@ -15,6 +19,9 @@ CHART_TYPE_FIELDS = {
     "histogram": ["x", "nbins", "histfunc"],
 }
 
+# Chart config fields whose values are column names
+COLUMN_FIELDS = ["x", "y", "color", "size", "facet_row", "facet_col", "values", "names"]
+
 
 def _can_add_field(selections, available):
     return len(selections) < len(available)
@@ -24,23 +31,37 @@ def _available_options(selections, available):
     return [option for option in available if option not in selections]
 
 
-def _sort_dataframe(df: pd.DataFrame, query: Query):
-    try:
-        time_dimensions = [
-            col for col in df.columns if col in query.time_dimension_names
-        ]
-    except KeyError:
-        return df
-    else:
-        if len(time_dimensions) > 0:
-            col = time_dimensions[0]
-            is_sorted = df[col].is_monotonic_increasing
-            if not is_sorted:
-                df = df.sort_values(by=col)
-        return df
+def _sort_table(table: pa.Table, query: Query) -> pa.Table:
+    time_dimensions = [
+        col for col in table.column_names if col in query.time_dimension_names
+    ]
+    if len(time_dimensions) > 0 and table.num_rows > 1:
+        col = table[time_dimensions[0]]
+        is_sorted = pc.all(pc.greater_equal(col[1:], col[:-1])).as_py()
+        if not is_sorted:
+            table = table.sort_by(time_dimensions[0])
+    return table
+
+
+def _chart_columns(chart_config: Dict) -> List[str]:
+    columns = []
+    for field in COLUMN_FIELDS:
+        value = chart_config.get(field)
+        for col in value if isinstance(value, list) else [value]:
+            if col is not None and col not in columns:
+                columns.append(col)
+    y2 = chart_config.get("y2")
+    if y2 is not None and y2["metric"] is not None and y2["metric"] not in columns:
+        columns.append(y2["metric"])
+    return columns
+
+
+def _chart_data(table: pa.Table, columns: List[str]) -> Dict:
+    """Convert only the columns a chart uses, as NumPy arrays for plotly."""
+    return {col: table[col].to_numpy() for col in columns if col in table.column_names}
 
 
-def _add_secondary_yaxis(df, fig, dct):
+def _add_secondary_yaxis(data, fig, dct):
     import plotly.graph_objects as go
     from plotly.subplots import make_subplots
 
@@ -64,14 +85,14 @@ def _add_secondary_yaxis(df, fig, dct):
 
     new_fig.add_trace(
         getattr(go, chart_map[dct["chart_type"]])(
-            x=df[dct["x"]], y=df[dct["y"]], **addl_config
+            x=data[dct["x"]], y=data[dct["y"]], **addl_config
         ),
         secondary_y=True,
     )
     return new_fig
 
 
-def create_chart(df, query: Query, suffix: str):
+def create_chart(table: pa.Table, query: Query, suffix: str):
     col1, col2 = st.columns([0.2, 0.8])
 
     # Create default chart types
@@ -266,14 +287,15 @@ def create_chart(df, query: Query, suffix: str):
 
     st.session_state.chart_config = chart_config
     with col2:
-        df = _sort_dataframe(df, query)
+        table = _sort_table(table, query)
+        data = _chart_data(table, _chart_columns(chart_config))
         y2_dict = chart_config.pop("y2", None)
-        fig = getattr(px, selected_chart_type)(df, **chart_config)
+        fig = getattr(px, selected_chart_type)(data, **chart_config)
         if y2_dict is not None and y2_dict["metric"] is not None:
             dct = {
                 "y": y2_dict["metric"],
                 "x": chart_config["x"],
                 "chart_type": y2_dict["chart_type"],
             }
-            fig = _add_secondary_yaxis(df, fig, dct)
+            fig = _add_secondary_yaxis(data, fig, dct)
         st.plotly_chart(fig, theme="streamlit", use_container_width=True)
@@ -1,26 +1,159 @@
 # stdlib
+import hashlib
+import os
+import random
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Iterator, Tuple
 from urllib.parse import parse_qs, urlparse
 
 # third party
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
 
-# first party
-from queries import GRAPHQL_QUERIES
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
 
 
 @dataclass
 class ConnAttr:
-    host: str  # "grpc+tls:semantic-layer.cloud.getdbt.com:443"
+    host: str  # "https://semantic-layer.cloud.getdbt.com"
     params: dict  # {"environmentId": 42}
     auth_header: str  # "Bearer dbts_thisismyprivateservicetoken"
+    flight_uri: str = None  # "grpc+tls://semantic-layer.cloud.getdbt.com:443"
+    result_transport: str = "graphql"  # or "flight"
 
 
 RESULT_STATUSES = ["pending", "running", "compiled", "failed", "successful"]
 
 
+class SemanticLayerError(Exception):
+    """Raised when the Semantic Layer API returns an error or a failed query."""
+
+
+# Connection pool settings for the transport shared by every caller of
+# `submit_request`.  Each host (Semantic Layer, Discovery API) gets its own pool.
+POOL_CONNECTIONS = int(os.environ.get("DBT_SL_POOL_CONNECTIONS", 4))
+POOL_MAXSIZE = int(os.environ.get("DBT_SL_POOL_MAXSIZE", 16))
+CONNECT_TIMEOUT = float(os.environ.get("DBT_SL_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.environ.get("DBT_SL_READ_TIMEOUT", 60))
+HTTP2 = os.environ.get("DBT_SL_HTTP2", "false").lower() in ("1", "true", "yes")
+
+
+@dataclass(frozen=True)
+class PollingStrategy:
+    """Schedule of sleeps between `get_results` polls.
+
+    The first poll happens almost immediately so queries that compile instantly
+    (e.g. cache hits on the Semantic Layer side) return without added latency.
+    After that the interval grows exponentially, with jitter, up to a ceiling.
+    """
+
+    first_interval: float = 0.05
+    initial_interval: float = 0.25
+    multiplier: float = 1.6
+    max_interval: float = 5.0
+    jitter: float = 0.2
+
+    def intervals(self) -> Iterator[float]:
+        yield self.first_interval
+        interval = self.initial_interval
+        while True:
+            spread = interval * self.jitter
+            yield min(self.max_interval, interval + random.uniform(-spread, spread))
+            interval = min(self.max_interval, interval * self.multiplier)
+
+
+DEFAULT_POLLING = PollingStrategy(
+    first_interval=float(os.environ.get("DBT_SL_POLL_FIRST_INTERVAL", 0.05)),
+    initial_interval=float(os.environ.get("DBT_SL_POLL_INITIAL_INTERVAL", 0.25)),
+    multiplier=float(os.environ.get("DBT_SL_POLL_MULTIPLIER", 1.6)),
+    max_interval=float(os.environ.get("DBT_SL_POLL_MAX_INTERVAL", 5.0)),
+    jitter=float(os.environ.get("DBT_SL_POLL_JITTER", 0.2)),
+)
+
+
+class Transport:
+    """Pooled, keep-alive HTTP transport bound to a single set of credentials.
+
+    Uses an `httpx.Client` when HTTP/2 is requested and `httpx` (with `h2`) is
+    installed, otherwise a `requests.Session` with a sized connection pool.
+    """
+
+    def __init__(
+        self,
+        auth_header: str,
+        *,
+        pool_connections: int = POOL_CONNECTIONS,
+        pool_maxsize: int = POOL_MAXSIZE,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        http2: bool = HTTP2,
+    ):
+        self.auth_header = auth_header
+        self.timeout = (connect_timeout, read_timeout)
+        self.http2 = http2 and httpx is not None
+        if self.http2:
+            try:
+                self._client = httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(
+                        max_connections=pool_connections * pool_maxsize,
+                        max_keepalive_connections=pool_maxsize,
+                    ),
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                )
+            except ImportError:
+                # `h2` isn't installed
+                self.http2 = False
+
+        if not self.http2:
+            self._client = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections, pool_maxsize=pool_maxsize
+            )
+            self._client.mount("https://", adapter)
+            self._client.mount("http://", adapter)
+
+    def post(self, url: str, payload: Dict, source: str = None) -> Dict:
+        headers = {
+            "Authorization": self.auth_header,
+            "x-dbt-partner-source": source or "streamlit",
+        }
+        if self.http2:
+            r = self._client.post(url, json=payload, headers=headers)
+        else:
+            r = self._client.post(
+                url, json=payload, headers=headers, timeout=self.timeout
+            )
+        return r.json()
+
+    def close(self):
+        self._client.close()
+
+
+def _transport_key(conn: ConnAttr) -> Tuple[str, str]:
+    # Never use the raw token as a cache key
+    token_hash = hashlib.sha256(conn.auth_header.encode("utf-8")).hexdigest()
+    return conn.host, token_hash
+
+
+@st.cache_resource(show_spinner=False)
+def _get_transport(host: str, token_hash: str, _auth_header: str) -> Transport:
+    return Transport(_auth_header)
+
+
+def get_transport(conn: ConnAttr) -> Transport:
+    """Return the process-wide transport for a connection.
+
+    The same transport (and its connection pool) is reused across reruns and
+    sessions that share the same host and credentials.
+    """
+    return _get_transport(*_transport_key(conn), conn.auth_header)
+
+
 def submit_request(
     _conn_attr: ConnAttr,
     payload: Dict,
@@ -33,15 +166,7 @@ def submit_request(
     if "variables" not in payload:
         payload["variables"] = {}
     payload["variables"]["environmentId"] = _conn_attr.params["environmentid"]
-    r = requests.post(
-        url,
-        json=payload,
-        headers={
-            "Authorization": _conn_attr.auth_header,
-            "x-dbt-partner-source": source or "streamlit",
-        },
-    )
-    return r.json()
+    return get_transport(_conn_attr).post(url, payload, source=source)
 
 
 @st.cache_data
@@ -58,6 +183,7 @@ def get_connection_attributes(uri):
             host=parsed.path.replace("arrow-flight-sql", "https").replace(":443", ""),
             params=params,
             auth_header=f"Bearer {token}",
+            flight_uri=parsed.path.replace("arrow-flight-sql", "grpc+tls"),
         )
 
 
@@ -80,35 +206,28 @@ def get_query_results(
             progress_bar.progress(80, "Query Failed!")
         st.error(json["errors"][0]["message"])
         st.stop()
-    while True:
-        graphql_query = GRAPHQL_QUERIES["get_results"]
-        results_payload = {"variables": {"queryId": query_id}, "query": graphql_query}
-        json = submit_request(conn, results_payload)
-        try:
-            data = json["data"]["query"]
-        except TypeError:
-            if progress:
-                progress_bar.progress(80, "Query Failed!")
-            st.error(json["errors"][0]["message"])
-            st.stop()
-        else:
-            status = data["status"].lower()
-            if status == "successful":
-                if progress:
-                    progress_bar.progress(100, "Query Successful!")
-                break
-            elif status == "failed":
-                if progress:
-                    progress_bar.progress(
-                        (RESULT_STATUSES.index(status) + 1) * 20, "red:Query Failed!"
-                    )
-                st.error(data["error"])
-                st.stop()
-            else:
-                if progress:
-                    progress_bar.progress(
-                        (RESULT_STATUSES.index(status) + 1) * 20,
-                        f"Query is {status.capitalize()}...",
-                    )
+    # Imported here as the poller itself submits requests through this module
+    from poller import get_status_poller
+
+    pending = get_status_poller().submit(conn, query_id)
+    while not pending.wait(timeout=0.1):
+        if progress:
+            status = pending.status
+            progress_bar.progress(
+                (RESULT_STATUSES.index(status) + 1) * 20,
+                f"Query is {status.capitalize()}...",
+            )
+    try:
+        data = pending.result()
+    except SemanticLayerError as e:
+        if progress:
+            progress_bar.progress(
+                (RESULT_STATUSES.index("failed") + 1) * 20, "red:Query Failed!"
+            )
+        st.error(str(e))
+        st.stop()
+    else:
+        if progress:
+            progress_bar.progress(100, "Query Successful!")
 
     return data
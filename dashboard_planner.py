@@ -0,0 +1,108 @@
+# stdlib
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional
+
+# third party
+import pandas as pd
+
+# Above this many rows over a tenant's history, views are queried with the date
+# range and grain pushed down instead of loading the history and slicing it
+PUSHDOWN_MIN_ROWS = int(os.environ.get("DBT_SL_PUSHDOWN_MIN_ROWS", 1000))
+PLAN_MODES = ["Auto", "Pushdown", "Local"]
+TIME_DIMENSION = "metric_time"
+DAY = f"{TIME_DIMENSION}__day"
+
+
+def to_date(value: Any) -> date:
+    return pd.Timestamp(value).date()
+
+
+def time_filter(start: Any, end: Any) -> str:
+    return (
+        f"{{{{ TimeDimension('{TIME_DIMENSION}', 'DAY') }}}} "
+        f"between '{to_date(start).isoformat()}' and '{to_date(end).isoformat()}'"
+    )
+
+
+class View(NamedTuple):
+    """One query of the dashboard restricted to a date range and grain."""
+
+    name: str
+    start: date
+    end: date
+    # None drops the time dimension altogether
+    grain: Optional[str]
+
+    def query(self, queries: Dict[str, Dict]) -> Dict:
+        """The query for `name` with the range and grain applied."""
+        query = queries[self.name]
+        group_by = [g for g in query.get("group_by", []) if g != DAY]
+        if self.grain is not None and DAY in query.get("group_by", []):
+            group_by.insert(0, f"{TIME_DIMENSION}__{self.grain}")
+        where = [*query.get("where", []), time_filter(self.start, self.end)]
+        return {**query, "group_by": group_by, "where": where}
+
+
+@dataclass(frozen=True)
+class Plan:
+    pushdown: bool
+    expected_rows: int
+    reason: str
+
+
+class DashboardPlanner:
+    """Decides whether a dashboard query runs locally or is pushed down.
+
+    Running locally loads a tenant's whole daily history once and slices it in
+    pandas, which is cheapest when the history is already cached or small.
+    Otherwise the range and grain are pushed down to the Semantic Layer.
+    Rows per day of history are learned from each full load of a query.
+    """
+
+    def __init__(self, min_rows: int = PUSHDOWN_MIN_ROWS):
+        self.min_rows = min_rows
+        self._lock = threading.Lock()
+        self._rows_per_day: Dict[Hashable, float] = {}
+
+    def observe(self, name: Hashable, rows: int, days: int):
+        if days <= 0:
+            return
+
+        with self._lock:
+            self._rows_per_day[name] = max(self._rows_per_day.get(name, 0), rows / days)
+
+    def expected_rows(self, name: Hashable, days: int) -> int:
+        with self._lock:
+            return int(days * self._rows_per_day.get(name, 1.0))
+
+    def plan(self, name: Hashable, days: int, cached: bool, mode: str = "Auto") -> Plan:
+        rows = self.expected_rows(name, days)
+        if mode == "Local":
+            return Plan(False, rows, "local mode")
+
+        if mode == "Pushdown":
+            return Plan(True, rows, "pushdown mode")
+
+        if cached:
+            return Plan(False, rows, "history cached")
+
+        if rows <= self.min_rows:
+            return Plan(False, rows, f"~{rows:,} rows in history")
+
+        return Plan(True, rows, f"~{rows:,} rows in history")
+
+
+def history_days(start: Any, end: Any) -> int:
+    return (to_date(end) - to_date(start)).days + 1
+
+
+def clamp_range(value: Optional[List], start: Any, end: Any) -> List:
+    """`value` limited to [start, end]; the whole range if it falls outside."""
+    if not value:
+        return [start, end]
+
+    low, high = max(value[0], start), min(value[1], end)
+    return [low, high] if low <= high else [start, end]
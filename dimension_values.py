@@ -0,0 +1,328 @@
+# stdlib
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+# third party
+import streamlit as st
+
+# first party
+from async_client import AsyncSemanticLayerClient, get_sync_client
+from client import ConnAttr
+from helpers import to_arrow_table
+from result_cache import CACHE_DIR, environment_key
+
+DIMENSION_VALUES_TTL = int(os.environ.get("DBT_SL_DIMENSION_VALUES_TTL", 60 * 60 * 6))
+WARM_DIMENSIONS = int(os.environ.get("DBT_SL_WARM_DIMENSIONS", 20))
+# Dimensions with more distinct values than this are searched by prefix
+SEARCH_THRESHOLD = int(os.environ.get("DBT_SL_DIMENSION_SEARCH_THRESHOLD", 1000))
+SEARCH_PAGE_SIZE = int(os.environ.get("DBT_SL_DIMENSION_SEARCH_PAGE_SIZE", 200))
+# Usage counts are written to disk at most once per interval
+USAGE_FLUSH_INTERVAL = float(os.environ.get("DBT_SL_USAGE_FLUSH_INTERVAL", 10))
+
+
+def _values_from_results(data: Dict) -> List:
+    # Server order is kept, paging continues from the last value
+    table = to_arrow_table(data["arrowResult"], to_pandas=False)
+    return table.column(0).drop_null().to_pylist()
+
+
+class DimensionSearchIndex:
+    """Values of a high-cardinality dimension fetched so far, searched by prefix.
+
+    Each prefix keeps the pages fetched for it in the warehouse's order, so
+    the values shown and the keyset cursor (the last value) follow the same
+    collation.  Once a prefix has no more pages, every longer prefix is
+    answered by filtering its values.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages: Dict[str, List] = {}
+        self._exhausted: Set[str] = set()
+        self.created_at = time.time()
+
+    def add(self, prefix: str, values: List, exhausted: bool):
+        with self._lock:
+            self._pages.setdefault(prefix, []).extend(values)
+            if exhausted:
+                self._exhausted.add(prefix)
+
+    def search(self, prefix: str) -> List:
+        with self._lock:
+            if prefix in self._pages:
+                return list(self._pages[prefix])
+
+            for parent in sorted(self._exhausted, key=len, reverse=True):
+                if prefix.startswith(parent):
+                    values = self._pages.get(parent, [])
+                    return [v for v in values if str(v).startswith(prefix)]
+
+            return []
+
+    def _covered(self, prefix: str) -> bool:
+        return any(prefix.startswith(p) for p in self._exhausted)
+
+    def fetched(self, prefix: str) -> bool:
+        with self._lock:
+            return prefix in self._pages or self._covered(prefix)
+
+    def exhausted(self, prefix: str) -> bool:
+        with self._lock:
+            return self._covered(prefix)
+
+    def cursor(self, prefix: str) -> Any:
+        with self._lock:
+            page = self._pages.get(prefix)
+            return page[-1] if page else None
+
+
+class DimensionValuesStore:
+    """Dimension values cached per environment + dimension with a TTL.
+
+    Values live in memory and on disk, so they survive restarts and are shared
+    by every session.  Missing values for several dimensions are fetched
+    concurrently, and usage counts decide which dimensions get warmed.
+
+    Each fetch is capped just above `search_threshold` rows; dimensions that hit
+    the cap are marked incomplete and searched page by page with `search`.
+    """
+
+    def __init__(
+        self,
+        directory: str = os.path.join(CACHE_DIR, "dimension_values"),
+        ttl: int = DIMENSION_VALUES_TTL,
+        search_threshold: int = SEARCH_THRESHOLD,
+        page_size: int = SEARCH_PAGE_SIZE,
+        usage_flush_interval: float = USAGE_FLUSH_INTERVAL,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.search_threshold = search_threshold
+        self.page_size = page_size
+        self.usage_flush_interval = usage_flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # (environment, dimension) -> (values, fetched at, complete)
+        self._memory: Dict[Tuple[str, str], Tuple[List, float, bool]] = {}
+        self._indexes: Dict[Tuple[str, str], DimensionSearchIndex] = {}
+        self._usage: Dict[str, Counter] = {}
+        # environment -> scheduled write of its usage counts
+        self._usage_flushes: Dict[str, threading.Timer] = {}
+        self._usage_write_lock = threading.Lock()
+        # environment -> warm-up in flight
+        self._warming: Dict[str, Future] = {}
+
+    def _path(self, env: str, dimension: str) -> str:
+        key = hashlib.sha256(f"{env}|{dimension}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _usage_path(self, env: str) -> str:
+        key = hashlib.sha256(env.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"usage_{key}.json")
+
+    def _entry(self, env: str, dimension: str) -> Optional[Tuple[List, float, bool]]:
+        with self._lock:
+            cached = self._memory.get((env, dimension))
+        if cached is None:
+            try:
+                with open(self._path(env, dimension)) as f:
+                    data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                return None
+            cached = (data["values"], data["fetched_at"], data.get("complete", True))
+            with self._lock:
+                self._memory[(env, dimension)] = cached
+
+        if time.time() - cached[1] > self.ttl:
+            return None
+
+        return cached
+
+    def get(self, conn: ConnAttr, dimension: str) -> Optional[List]:
+        """Values in warehouse order; only the first ones if there are too many."""
+        entry = self._entry(environment_key(conn), dimension)
+        return None if entry is None else entry[0]
+
+    def is_searchable(self, conn: ConnAttr, dimension: str) -> bool:
+        """True when the dimension has too many values to list them all."""
+        entry = self._entry(environment_key(conn), dimension)
+        return entry is not None and not entry[2]
+
+    def put(self, conn: ConnAttr, dimension: str, values: List, complete: bool = True):
+        env = environment_key(conn)
+        fetched_at = time.time()
+        with self._lock:
+            self._memory[(env, dimension)] = (values, fetched_at, complete)
+        path = self._path(env, dimension)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"values": values, "fetched_at": fetched_at, "complete": complete},
+                f,
+                default=str,
+            )
+        os.replace(tmp_path, path)
+
+    def fetch(
+        self, conn: ConnAttr, dimensions: List[str]
+    ) -> Dict[str, Union[List, Exception]]:
+        """Return values for every dimension, fetching the missing ones at once.
+
+        A dimension whose values couldn't be fetched maps to the error.
+        """
+        values = {d: self.get(conn, d) for d in dict.fromkeys(dimensions)}
+        missing = [d for d, v in values.items() if v is None]
+        if missing:
+            client = get_sync_client(conn)
+            future = client.submit(self._fetch_async(client.client, conn, missing))
+            values.update(future.result())
+        return values
+
+    def warm(self, conn: ConnAttr, dimensions: List[str]) -> Future:
+        """Fetch values for dimensions in the background without blocking.
+
+        Every session loading the catalog asks for a warm-up; while one is in
+        flight for the environment, it is returned instead of starting another.
+        """
+        env = environment_key(conn)
+        missing = [d for d in dimensions if self.get(conn, d) is None]
+        with self._lock:
+            running = self._warming.get(env)
+            if running is not None and not running.done():
+                return running
+
+            client = get_sync_client(conn)
+            future = self._warming[env] = client.submit(
+                self._fetch_async(client.client, conn, missing)
+            )
+        return future
+
+    async def _fetch_async(
+        self, client: AsyncSemanticLayerClient, conn: ConnAttr, dimensions: List[str]
+    ) -> Dict[str, Union[List, Exception]]:
+        # One row past the threshold tells a complete list from a truncated one
+        results = await asyncio.gather(
+            *[
+                client.dimension_values_page(d, limit=self.search_threshold + 1)
+                for d in dimensions
+            ],
+            return_exceptions=True,
+        )
+        values = {}
+        for dimension, data in zip(dimensions, results):
+            if isinstance(data, Exception):
+                # Not cached, it will be retried the next time it's needed
+                print(f"Error fetching dimension values for {dimension}; {data}")
+                values[dimension] = data
+                continue
+            page = _values_from_results(data)
+            complete = len(page) <= self.search_threshold
+            if complete:
+                values[dimension] = page
+            else:
+                values[dimension] = page[: self.search_threshold]
+                self._search_index(conn, dimension).add("", page, exhausted=False)
+            self.put(conn, dimension, values[dimension], complete=complete)
+        return values
+
+    def _search_index(self, conn: ConnAttr, dimension: str) -> DimensionSearchIndex:
+        key = (environment_key(conn), dimension)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None or time.time() - index.created_at > self.ttl:
+                index = self._indexes[key] = DimensionSearchIndex()
+        return index
+
+    def search(
+        self, conn: ConnAttr, dimension: str, prefix: str = "", more: bool = False
+    ) -> Tuple[List, bool]:
+        """Values starting with `prefix` and whether every match has been fetched.
+
+        At most one page is fetched per call: the first page for a new prefix,
+        or the next one when `more` is set.
+        """
+        index = self._search_index(conn, dimension)
+        if not index.exhausted(prefix) and (more or not index.fetched(prefix)):
+            data = get_sync_client(conn).dimension_values_page(
+                dimension,
+                limit=self.page_size,
+                prefix=prefix or None,
+                after=index.cursor(prefix),
+            )
+            page = _values_from_results(data)
+            index.add(prefix, page, exhausted=len(page) < self.page_size)
+
+        return index.search(prefix), index.exhausted(prefix)
+
+    def _load_usage(self, env: str) -> Counter:
+        if env not in self._usage:
+            try:
+                with open(self._usage_path(env)) as f:
+                    self._usage[env] = Counter(json.load(f))
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._usage[env] = Counter()
+        return self._usage[env]
+
+    def record_use(self, conn: ConnAttr, dimension: str):
+        env = environment_key(conn)
+        with self._lock:
+            self._load_usage(env)[dimension] += 1
+            if env in self._usage_flushes:
+                return
+
+            timer = self._usage_flushes[env] = threading.Timer(
+                self.usage_flush_interval, self._flush_usage, args=(env,)
+            )
+            timer.daemon = True
+        timer.start()
+
+    def _flush_usage(self, env: str):
+        # Writes are serialized so an older snapshot never replaces a newer one
+        with self._usage_write_lock:
+            with self._lock:
+                self._usage_flushes.pop(env, None)
+                usage = dict(self._usage[env])
+            path = self._usage_path(env)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(usage, f)
+            os.replace(tmp_path, path)
+
+    def most_used(self, conn: ConnAttr, candidates: List[str], n: int) -> List[str]:
+        """Top `n` candidates by recorded usage; ties keep the candidates' order."""
+        with self._lock:
+            usage = self._load_usage(environment_key(conn))
+        ranked = sorted(
+            enumerate(candidates), key=lambda c: (-usage.get(c[1], 0), c[0])
+        )
+        return [dimension for _, dimension in ranked[:n]]
+
+
+@st.cache_resource(show_spinner=False)
+def get_dimension_values_store() -> DimensionValuesStore:
+    return DimensionValuesStore()
+
+
+def warm_dimension_values(conn: ConnAttr, catalog_index, n: int = WARM_DIMENSIONS):
+    """Warm the most used categorical dimensions after a catalog loads.
+
+    Without usage history, dimensions shared by the most metrics go first.
+    """
+    categorical = [
+        d for d in catalog_index.dimensions if catalog_index.dimension_type(d) != "TIME"
+    ]
+    by_metric_count = sorted(
+        categorical,
+        key=lambda d: -bin(
+            catalog_index.dimension_metrics[catalog_index.dimension_ids[d]]
+        ).count("1"),
+    )
+    store = get_dimension_values_store()
+    return store.warm(conn, store.most_used(conn, by_metric_count, n))
@@ -0,0 +1,132 @@
+# stdlib
+import contextlib
+import os
+import threading
+from typing import Iterator
+
+# third party
+import pyarrow as pa
+import streamlit as st
+
+try:
+    import adbc_driver_flightsql.dbapi as flightsql
+    from adbc_driver_flightsql import DatabaseOptions
+except ImportError:  # pragma: no cover
+    flightsql = None
+
+# first party
+from client import READ_TIMEOUT, ConnAttr, _transport_key
+
+# Connections per transport, so that many queries can run at once
+FLIGHT_POOL_SIZE = int(os.environ.get("DBT_SL_FLIGHT_POOL_SIZE", 4))
+
+
+class FlightSQLTransport:
+    """Runs `Query.jdbc_query` text over Arrow Flight SQL.
+
+    Results arrive as Arrow record batches instead of a base64 string inside
+    JSON, so nothing is decoded or copied on the way into a `pa.Table`.  Up to
+    `pool_size` queries run at once, each on its own connection.  The URI can
+    point at a local Flight SQL server (e.g. `grpc://localhost:31337`) for
+    development.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        auth_header: str,
+        environment_id: str,
+        timeout: float = READ_TIMEOUT,
+        pool_size: int = FLIGHT_POOL_SIZE,
+    ):
+        if flightsql is None:
+            raise ImportError(
+                "adbc-driver-flightsql is required for the Arrow Flight SQL transport"
+            )
+
+        self.uri = uri
+        self._db_kwargs = {
+            DatabaseOptions.AUTHORIZATION_HEADER.value: auth_header,
+            f"{DatabaseOptions.RPC_CALL_HEADER_PREFIX.value}environmentid": str(
+                environment_id
+            ),
+            DatabaseOptions.WITH_COOKIE_MIDDLEWARE.value: "true",
+            DatabaseOptions.TIMEOUT_QUERY.value: str(timeout),
+            DatabaseOptions.TIMEOUT_FETCH.value: str(timeout),
+        }
+        # DB-API connections aren't safe to share between threads, so each one
+        # is checked out by a single query at a time
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _checkout(self):
+        self._slots.acquire()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+
+        try:
+            return flightsql.connect(self.uri, db_kwargs=self._db_kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkin(self, connection):
+        with self._lock:
+            self._idle.append(connection)
+        self._slots.release()
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        finally:
+            self._slots.release()
+
+    @contextlib.contextmanager
+    def stream(self, sql: str) -> Iterator[pa.RecordBatchReader]:
+        """Reader yielding record batches as they are received from the server.
+
+        The connection is held until the block exits, and is dropped instead of
+        reused if the query or the read fails.
+        """
+        connection = self._checkout()
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(sql)
+                yield cursor.fetch_record_batch()
+            finally:
+                cursor.close()
+        except BaseException:
+            self._discard(connection)
+            raise
+
+        self._checkin(connection)
+
+    def execute(self, sql: str) -> pa.Table:
+        with self.stream(sql) as reader:
+            return reader.read_all()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_flight_transport(
+    uri: str, token_hash: str, environment_id: str, _auth_header: str
+) -> FlightSQLTransport:
+    return FlightSQLTransport(uri, _auth_header, environment_id)
+
+
+def get_flight_transport(conn: ConnAttr) -> FlightSQLTransport:
+    """Return the process-wide Flight SQL transport for a connection."""
+    _, token_hash = _transport_key(conn)
+    return _get_flight_transport(
+        conn.flight_uri, token_hash, str(conn.params["environmentid"]), conn.auth_header
+    )
@@ -1,16 +1,21 @@
 # stdlib
 import base64
+import binascii
+import contextlib
 import json
 import urllib.parse
-from typing import List
+from typing import Dict, List, Tuple, Union
 
 # third party
+import pandas as pd
 import pyarrow as pa
 import streamlit as st
 
 # first party
 from chart import create_chart
-from client import ConnAttr
+from client import ConnAttr, get_query_results
+from flight_sql import get_flight_transport
+from result_cache import get_result_cache, payload_key, query_key
 from schema import Query
 
 
@@ -30,16 +35,135 @@ def get_shared_elements(all_elements: List[List]):
     return list(unique)
 
 
-def to_arrow_table(byte_string: str, to_pandas: bool = True) -> pa.Table:
-    with pa.ipc.open_stream(base64.b64decode(byte_string)) as reader:
-        arrow_table = pa.Table.from_batches(reader, reader.schema)
+def _decode_arrow_result(byte_string: str) -> pa.Buffer:
+    # `a2b_base64` reads the ASCII str in place (b64decode would first copy it to
+    # bytes) and `py_buffer` wraps the decoded bytes without copying them again.
+    return pa.py_buffer(binascii.a2b_base64(byte_string))
+
+
+def arrow_to_pandas(
+    table: pa.Table,
+    *,
+    self_destruct: bool = True,
+    split_blocks: bool = True,
+    categorical: Union[bool, List[str]] = False,
+    arrow_dtypes: bool = False,
+) -> pd.DataFrame:
+    """Convert a table to pandas while keeping peak memory close to one copy.
+
+    `self_destruct` releases each Arrow column once it has been converted, so
+    the table must not be used afterwards.  `categorical` converts every string
+    column (True) or only the named columns to categoricals, and
+    `arrow_dtypes` keeps Arrow-backed pandas dtypes instead of NumPy ones.
+    """
+    kwargs = {"self_destruct": self_destruct, "split_blocks": split_blocks}
+    if categorical is True:
+        kwargs["strings_to_categorical"] = True
+    elif categorical:
+        kwargs["categories"] = list(categorical)
+    if arrow_dtypes:
+        kwargs["types_mapper"] = pd.ArrowDtype
+    return table.to_pandas(**kwargs)
+
+
+def to_arrow_table(
+    byte_string: str, to_pandas: bool = True, **pandas_options
+) -> pa.Table:
+    with pa.ipc.open_stream(_decode_arrow_result(byte_string)) as reader:
+        arrow_table = reader.read_all()
 
     if to_pandas:
-        return arrow_table.to_pandas()
+        return arrow_to_pandas(arrow_table, **pandas_options)
 
     return arrow_table
 
 
+def read_batches(reader: pa.RecordBatchReader, status=None) -> pa.Table:
+    """Collect streamed record batches, showing the rows received in `status`."""
+    batches = []
+    rows = 0
+    for batch in reader:
+        batches.append(batch)
+        rows += batch.num_rows
+        if status is not None:
+            status.caption(f"Received {rows:,} rows")
+    if status is not None:
+        status.empty()
+    return pa.Table.from_batches(batches, schema=reader.schema)
+
+
+def order_columns(table: pa.Table, names: List[str]) -> pa.Table:
+    """`table` with the columns named in `names` first, in that order."""
+    by_name = {col.lower(): col for col in table.column_names}
+    first = [by_name[n.lower()] for n in names if n.lower() in by_name]
+    rest = [col for col in table.column_names if col not in first]
+    return table.select(first + rest)
+
+
+def lowercase_columns(table: pa.Table) -> pa.Table:
+    return table.rename_columns([col.lower() for col in table.column_names])
+
+
+def run_query(
+    payload: Dict = None,
+    *,
+    query: Query = None,
+    source: str = None,
+    key: str = "createQuery",
+    progress: bool = True,
+    conn: ConnAttr = None,
+    to_pandas: bool = True,
+) -> Tuple:
+    """Return `(results, compiled_sql)` for a payload, using the on-disk cache.
+
+    Results are only fetched from the Semantic Layer when the same query hasn't
+    already been cached for this environment.  When a `Query` is given, it is
+    cached under its canonical form so semantically identical queries share
+    hits (with columns put back in this query's order), and it is run over
+    Arrow Flight SQL if the connection selected that transport.
+    """
+    conn = conn or st.session_state.conn
+    cache = get_result_cache()
+    if query is not None:
+        payload = query.payload
+        cache_key = query_key(conn, query)
+    else:
+        cache_key = payload_key(conn, payload)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        table, metadata = cached
+        sql = metadata.get("sql")
+        if query is not None:
+            table = order_columns(table, query.all_names)
+    elif query is not None and conn.result_transport == "flight":
+        spinner = (
+            st.spinner("Streaming results over Arrow Flight SQL...")
+            if progress
+            else contextlib.nullcontext()
+        )
+        try:
+            with spinner, get_flight_transport(conn).stream(query.jdbc_query) as reader:
+                table = read_batches(reader, st.empty() if progress else None)
+        except Exception as e:
+            st.error(str(e))
+            st.stop()
+        # Compiled SQL isn't returned over Flight, show the request instead
+        sql = query.jdbc_query
+        cache.put(cache_key, table, {"sql": sql})
+    else:
+        data = get_query_results(
+            payload, source=source, key=key, progress=progress, conn=conn
+        )
+        table = to_arrow_table(data["arrowResult"], to_pandas=False)
+        sql = data["sql"]
+        cache.put(cache_key, table, {"sql": sql or ""})
+
+    if to_pandas:
+        return arrow_to_pandas(table), sql
+
+    return table, sql
+
+
 def create_graphql_code(query: Query) -> str:
     return f"""
 import requests
@@ -91,13 +215,14 @@ def create_tabs(state: st.session_state, suffix: str) -> None:
     keys_with_suffix = [f"{key}_{suffix}" for key in keys]
     if all(key in state for key in keys_with_suffix):
         sql = getattr(state, f"compiled_sql_{suffix}")
-        df = getattr(state, f"df_{suffix}")
+        # Results are kept as Arrow tables, which st.dataframe renders natively
+        table = getattr(state, f"df_{suffix}")
         query = getattr(state, f"query_{suffix}")
         tab1, tab2, tab3 = st.tabs(["Chart", "Data", "SQL"])
         with tab1:
-            create_chart(df, query, suffix)
+            create_chart(table, query, suffix)
         with tab2:
-            st.dataframe(df, use_container_width=True)
+            st.dataframe(table, use_container_width=True)
         with tab3:
             st.code(sql, language="sql")
         create_explorer_link(query)
@@ -0,0 +1,102 @@
+"""Compare embedding backends for the metadata index.
+
+Builds the index with each backend and reports build time and query latency.
+It also reports recall@k against the reference backend: the share of the
+reference's top-k documents the backend also returns.
+
+    python -m llm.benchmark_embeddings .sl_cache/catalogs/<hash>.json \\
+        --backends local openai --reference openai -k 6
+
+The catalog file is one saved by `catalog.CatalogStore` or a plain JSON list of
+metrics as returned by the Semantic Layer API.  Questions default to ones made
+up from metric and dimension names.
+"""
+
+# stdlib
+import argparse
+import json
+import time
+from typing import Dict, List
+
+# first party
+from llm.semantic_layer_docs import (
+    EMBEDDING_BACKENDS,
+    build_vector_index,
+    document_id,
+    get_embeddings,
+)
+
+
+def _words(name: str) -> str:
+    return name.replace("__", " ").replace("_", " ")
+
+
+def default_questions(metrics: List[Dict]) -> List[str]:
+    questions = []
+    for metric in metrics:
+        questions.append(f"What is {_words(metric['name'])}?")
+        dimensions = [d["name"] for d in metric["dimensions"]][:2]
+        for dimension in dimensions:
+            questions.append(f"Show me {_words(metric['name'])} by {_words(dimension)}")
+    return questions
+
+
+def top_k(db, questions: List[str], k: int) -> List[List[str]]:
+    return [
+        [document_id(d) for d in db.similarity_search(question, k=k)]
+        for question in questions
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("catalog", help="Path to a saved metrics catalog")
+    parser.add_argument(
+        "--backends", nargs="+", default=list(EMBEDDING_BACKENDS), metavar="BACKEND"
+    )
+    parser.add_argument("--reference", default="openai")
+    parser.add_argument("--questions", help="File with one question per line")
+    parser.add_argument("-k", type=int, default=6)
+    args = parser.parse_args()
+
+    with open(args.catalog) as f:
+        data = json.load(f)
+    metrics = data["metrics"] if isinstance(data, dict) else data
+
+    if args.questions:
+        with open(args.questions) as f:
+            questions = [line.strip() for line in f if line.strip()]
+    else:
+        questions = default_questions(metrics)
+
+    backends = list(dict.fromkeys([args.reference] + args.backends))
+    results = {}
+    for backend in backends:
+        embeddings = get_embeddings(backend)
+        start = time.perf_counter()
+        db = build_vector_index(metrics, embeddings=embeddings)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hits = top_k(db, questions, args.k)
+        query_time = (time.perf_counter() - start) / len(questions)
+        results[backend] = (build_time, query_time, hits)
+
+    reference_hits = results[args.reference][2]
+    print(
+        f"{len(metrics)} metrics, {db.index.ntotal} documents, "
+        f"{len(questions)} questions, k={args.k}, reference={args.reference}"
+    )
+    print(f"{'backend':<10}{'build (s)':>12}{'query (ms)':>12}{'recall@k':>10}")
+    for backend, (build_time, query_time, hits) in results.items():
+        recall = sum(
+            len(set(h) & set(r)) / len(r) for h, r in zip(hits, reference_hits) if r
+        ) / len(questions)
+        print(
+            f"{backend:<10}{build_time:>12.3f}{query_time * 1000:>12.2f}"
+            f"{recall:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
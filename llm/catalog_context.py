@@ -0,0 +1,97 @@
+# stdlib
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+# third party
+from langchain_community.vectorstores import FAISS
+
+# first party
+from catalog_index import CatalogIndex
+
+# Share of the model's context window the metric and dimension lists may use,
+# capped so large windows don't make every call slow
+CATALOG_CONTEXT_FRACTION = float(
+    os.environ.get("DBT_SL_CATALOG_CONTEXT_FRACTION", 0.25)
+)
+CATALOG_CONTEXT_MAX_TOKENS = int(
+    os.environ.get("DBT_SL_CATALOG_CONTEXT_MAX_TOKENS", 6000)
+)
+# Documents retrieved to pick candidate metrics and dimensions
+CATALOG_CONTEXT_K = int(os.environ.get("DBT_SL_CATALOG_CONTEXT_K", 24))
+# Rough characters per token for English text and identifiers
+CHARS_PER_TOKEN = 4
+
+_DOCUMENT_NAME = re.compile(r"^(metric|dimension|entity) name: ([^;]+);")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def token_budget(model_info: Dict) -> int:
+    """Tokens available for the catalog in a prompt for the given model."""
+    window = model_info.get("context_window", 4096)
+    return min(int(window * CATALOG_CONTEXT_FRACTION), CATALOG_CONTEXT_MAX_TOKENS)
+
+
+def _document_name(page_content: str) -> Optional[Tuple[str, str]]:
+    match = _DOCUMENT_NAME.match(page_content)
+    return None if match is None else (match.group(1), match.group(2).strip())
+
+
+def _fit(names: List[str], budget: int) -> List[str]:
+    """The leading names whose comma separated list fits in `budget` tokens."""
+    fitted, chars = [], 0
+    for name in names:
+        chars += len(name) + 2
+        if chars // CHARS_PER_TOKEN + 1 > budget:
+            break
+        fitted.append(name)
+    return fitted
+
+
+def select_catalog_context(
+    question: str,
+    db: FAISS,
+    catalog_index: CatalogIndex,
+    budget: int,
+    k: int = CATALOG_CONTEXT_K,
+) -> Tuple[List[str], List[str]]:
+    """Metrics and dimensions relevant to `question` that fit in `budget` tokens.
+
+    Metrics are ranked by the metadata documents retrieved for the question
+    (a dimension or entity match ranks the metrics it belongs to), followed by
+    the rest of the catalog.  A third of the budget goes to metrics; the rest
+    goes to dimensions compatible with the chosen metrics, retrieved ones and
+    ones shared by more of the chosen metrics first.
+    """
+    ranked_metrics: Dict[str, None] = {}
+    retrieved_dimensions: Dict[str, None] = {}
+    for document in db.similarity_search(question, k=k):
+        named = _document_name(document.page_content)
+        if named is None:
+            continue
+
+        kind, name = named
+        if kind == "metric":
+            ranked_metrics[name] = None
+        else:
+            if kind == "dimension":
+                retrieved_dimensions[name] = None
+            for metric in document.metadata.get("metrics", "").split(", "):
+                ranked_metrics[metric] = None
+
+    ranked = [m for m in ranked_metrics if m in catalog_index.metric_ids]
+    ranked += [m for m in catalog_index.metrics if m not in ranked_metrics]
+    metrics = _fit(ranked, budget // 3)
+
+    counts: Dict[str, int] = {}
+    for metric in metrics:
+        for dimension in catalog_index.compatible_dimensions([metric]):
+            counts[dimension] = counts.get(dimension, 0) + 1
+    dimensions = sorted(
+        counts, key=lambda d: (d not in retrieved_dimensions, -counts[d], d)
+    )
+    used = estimate_tokens(", ".join(metrics))
+    return metrics, _fit(dimensions, budget - used)
@@ -1,3 +1,4 @@
+from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import (
     ChatPromptTemplate,
     FewShotPromptTemplate,
@@ -6,18 +7,25 @@ from langchain_core.prompts import (
 )
 
 from llm.examples import EXAMPLES
+from schema import QuestionIntent
 
-rephrase_system_prompt = """
-You will be given a list of dialogues in a chat conversation in chronological order and a follow up question. Understand the flow of the conversation from the chat history and rephrase the question to be a standalone question.
-
+rephrase_rules = """
 The follow up question can do one of the two things,
 1) Refinement: The follow up question is used to refine a query they asked previously, this could be adding or removing a filter or breaking down the query with a group by. For this, only use dialogues that are after the latest metric query. Be sure to include the exact name of last relevant metric in standalone question.
 2) New Query: Switch context and start a new metric query. For this, do not use any of the previous dialogues.
 
 If the follow up question is not related to any of the past questions, then return the follow up question as the standalone question without any rephrasing.
-You are to reply with only the rephrased question. 
 """
 
+rephrase_system_prompt = (
+    """
+You will be given a list of dialogues in a chat conversation in chronological order and a follow up question. Understand the flow of the conversation from the chat history and rephrase the question to be a standalone question.
+"""
+    + rephrase_rules
+    + """You are to reply with only the rephrased question. 
+"""
+)
+
 rephrase_prompt = ChatPromptTemplate.from_messages(
     [
         ("system", rephrase_system_prompt),
@@ -26,13 +34,17 @@ rephrase_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-intent_prompt = PromptTemplate.from_template(
-    """
-Based on the user's question, classify the intent as one of the following:
+intent_definitions = """
 - "metadata" - The user is asking about metadata, such as what metrics or dimensions are
   available, how a metric is defined, or similar / related metrics.
 - "query" - The user is asking about data related to certain metrics.
-  
+"""
+
+intent_prompt = PromptTemplate.from_template(
+    """
+Based on the user's question, classify the intent as one of the following:"""
+    + intent_definitions
+    + """  
 IMPORTANT:  Only return either "query" or "metadata".
 
 <Examples>
@@ -52,6 +64,32 @@ Question:
 Determine the intent:"""
 )
 
+# Rephrase and intent in a single call, for follow up questions
+question_intent_parser = PydanticOutputParser(pydantic_object=QuestionIntent)
+
+question_intent_system_prompt = (
+    """
+You will be given a list of dialogues in a chat conversation in chronological order and a follow up question. Understand the flow of the conversation from the chat history and do two things.
+
+First, rephrase the follow up question to be a standalone question.
+"""
+    + rephrase_rules
+    + """
+Second, classify the intent of the standalone question as one of the following:"""
+    + intent_definitions
+    + """
+{format_instructions}
+"""
+)
+
+question_intent_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", question_intent_system_prompt),
+        MessagesPlaceholder("chat_history"),
+        ("human", "{input}"),
+    ]
+).partial(format_instructions=question_intent_parser.get_format_instructions())
+
 prefix = """
 You are an AI assistant that creates SQL queries based on user input and dbt Semantic 
 Layer context. Generate a JSON object, and only a JSON object, matching this Pydantic
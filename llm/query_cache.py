@@ -0,0 +1,205 @@
+# stdlib
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# third party
+import numpy as np
+import streamlit as st
+from langchain_core.embeddings import Embeddings
+
+# first party
+from client import ConnAttr
+from llm.semantic_layer_docs import get_embeddings
+from result_cache import CACHE_DIR, environment_key
+from schema import Query
+
+QUERY_CACHE_DIR = os.path.join(CACHE_DIR, "query_cache")
+QUERY_CACHE_THRESHOLD = os.environ.get("DBT_SL_QUERY_CACHE_THRESHOLD")
+# Hashed n-grams score rephrasings (and different questions sharing most of
+# their words) higher than semantic embeddings do
+DEFAULT_THRESHOLDS = {"HashingEmbeddings": 0.97}
+DEFAULT_THRESHOLD = 0.92
+QUERY_CACHE_MAX_ENTRIES = int(os.environ.get("DBT_SL_QUERY_CACHE_MAX_ENTRIES", 1000))
+
+
+_DATE_WORDS = set("""
+    january february march april may june july august september october
+    november december jan feb mar apr jun jul aug sep sept oct nov dec
+    monday tuesday wednesday thursday friday saturday sunday
+    today yesterday tomorrow last this next previous prior current ytd mtd qtd
+    """.split())
+_LITERAL = re.compile(r"""(?<!\w)'[^']+'(?!\w)|"[^"]+"|\d+(?:[.,/:-]\d+)*|[a-z]+""")
+
+
+def question_literals(question: str) -> Tuple[str, ...]:
+    """Numbers, dates and quoted values in a question.
+
+    Questions that differ only in these ask for different filters, however
+    similar their embeddings are.
+    """
+    literals = [
+        token
+        for token in _LITERAL.findall(question.lower())
+        if token[0] in "'\"" or token[0].isdigit() or token in _DATE_WORDS
+    ]
+    return tuple(sorted(literals))
+
+
+def cache_scope(conn: ConnAttr, catalog_hash: str) -> str:
+    """Generated queries are only reused for the same environment and catalog."""
+    return f"{environment_key(conn)}|{catalog_hash}"
+
+
+class _ScopeEntries:
+    def __init__(self, dimensions: int = 0):
+        self.questions: List[str] = []
+        self.queries: List[Dict] = []
+        self.vectors = np.zeros((0, dimensions), dtype=np.float32)
+
+
+class QueryCache:
+    """Queries generated by the LLM, looked up by question similarity.
+
+    Questions are embedded and compared by cosine similarity with the ones
+    already answered in the same scope; the closest one at or above
+    `threshold` with the same literals (see `question_literals`) has its
+    Query reused instead of calling the model.  The default threshold depends
+    on the embedding backend.  Entries are persisted per scope, oldest
+    dropped past `max_entries`.
+    """
+
+    def __init__(
+        self,
+        directory: str = QUERY_CACHE_DIR,
+        threshold: float = None,
+        max_entries: int = QUERY_CACHE_MAX_ENTRIES,
+        embeddings: Embeddings = None,
+    ):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.embeddings = embeddings or get_embeddings()
+        if threshold is None and QUERY_CACHE_THRESHOLD is not None:
+            threshold = float(QUERY_CACHE_THRESHOLD)
+        elif threshold is None:
+            threshold = DEFAULT_THRESHOLDS.get(
+                type(self.embeddings).__name__, DEFAULT_THRESHOLD
+            )
+        self.threshold = threshold
+        self.model = getattr(self.embeddings, "model", type(self.embeddings).__name__)
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._scopes: Dict[str, _ScopeEntries] = {}
+        # Questions are embedded on lookup and again on add, keep the last few
+        self._vectors: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, scope: str) -> str:
+        key = hashlib.sha256(f"{scope}|{self.model}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key)
+
+    def _entries(self, scope: str) -> _ScopeEntries:
+        entries = self._scopes.get(scope)
+        if entries is None:
+            entries = _ScopeEntries()
+            path = self._path(scope)
+            try:
+                with open(f"{path}.json") as f:
+                    data = json.load(f)
+                vectors = np.load(f"{path}.npy")
+            except (FileNotFoundError, ValueError):
+                pass
+            else:
+                entries.questions = data["questions"]
+                entries.queries = data["queries"]
+                entries.vectors = vectors
+            self._scopes[scope] = entries
+        return entries
+
+    def _save(self, scope: str, entries: _ScopeEntries):
+        path = self._path(scope)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"questions": entries.questions, "queries": entries.queries}, f)
+        os.replace(tmp_path, f"{path}.json")
+        with open(tmp_path, "wb") as f:
+            np.save(f, entries.vectors)
+        os.replace(tmp_path, f"{path}.npy")
+
+    def _embed(self, question: str) -> np.ndarray:
+        with self._lock:
+            vector = self._vectors.get(question)
+        if vector is None:
+            vector = np.asarray(self.embeddings.embed_query(question), np.float32)
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else vector
+            with self._lock:
+                self._vectors[question] = vector
+                while len(self._vectors) > 256:
+                    self._vectors.popitem(last=False)
+        return vector
+
+    def lookup(self, scope: str, question: str) -> Optional[Tuple[Query, float]]:
+        """The cached Query closest to `question` and its similarity, if any."""
+        vector = self._embed(question)
+        literals = question_literals(question)
+        with self._lock:
+            entries = self._entries(scope)
+            match = None
+            if len(entries.questions) > 0:
+                similarities = entries.vectors @ vector
+                for i in np.argsort(-similarities):
+                    if similarities[i] < self.threshold:
+                        break
+
+                    if question_literals(entries.questions[i]) == literals:
+                        match = int(i), float(similarities[i])
+                        break
+
+            if match is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            query = entries.queries[match[0]]
+        return Query.model_validate(query), match[1]
+
+    def add(self, scope: str, question: str, query: Query):
+        vector = self._embed(question)
+        with self._lock:
+            entries = self._entries(scope)
+            if question in entries.questions:
+                i = entries.questions.index(question)
+                entries.queries[i] = query.model_dump(exclude_none=True)
+            else:
+                if entries.vectors.shape[1] != len(vector):
+                    entries.vectors = entries.vectors.reshape(0, len(vector))
+                entries.questions.append(question)
+                entries.queries.append(query.model_dump(exclude_none=True))
+                entries.vectors = np.vstack([entries.vectors, vector[None, :]])
+                overflow = len(entries.questions) - self.max_entries
+                if overflow > 0:
+                    del entries.questions[:overflow]
+                    del entries.queries[:overflow]
+                    entries.vectors = entries.vectors[overflow:]
+            self._save(scope, entries)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": sum(len(e.questions) for e in self._scopes.values()),
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_query_cache() -> QueryCache:
+    return QueryCache()
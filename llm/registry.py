@@ -0,0 +1,145 @@
+# stdlib
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+# third party
+import streamlit as st
+from langchain.chat_models import init_chat_model
+from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
+from langchain_core.runnables import Runnable
+
+# first party
+from llm.prompt import (
+    intent_prompt,
+    metadata_prompt,
+    query_prompt,
+    question_intent_parser,
+    question_intent_prompt,
+    rephrase_prompt,
+)
+from schema import Query
+
+REGISTRY_IDLE_SECONDS = int(os.environ.get("DBT_SL_LLM_IDLE_SECONDS", 60 * 30))
+REGISTRY_MAX_ENTRIES = int(os.environ.get("DBT_SL_LLM_MAX_ENTRIES", 16))
+
+
+@dataclass(frozen=True)
+class LLMResources:
+    """A chat model client and the chains built on it."""
+
+    llm: BaseChatModel
+    rephrase_chain: Runnable
+    question_intent_chain: Runnable
+    intent_chain: Runnable
+    query_chain: Runnable
+    metadata_answer_chain: Runnable
+
+
+def build_resources(provider: str, model: str, api_key: str) -> LLMResources:
+    llm = init_chat_model(
+        model,
+        model_provider=provider,
+        temperature=0,
+        api_key=api_key,
+    )
+    # Create chains with custom names
+    return LLMResources(
+        llm=llm,
+        rephrase_chain=(
+            rephrase_prompt.with_config({"run_name": "Rephrase Prompt"})
+            | llm.with_config({"run_name": "Rephrase LLM Call"})
+            | StrOutputParser().with_config({"run_name": "Parse Rephrase Response"})
+        ).with_config({"run_name": "Rephrase User Question"}),
+        question_intent_chain=(
+            question_intent_prompt.with_config(
+                {"run_name": "Question and Intent Prompt"}
+            )
+            | llm.with_config({"run_name": "Question and Intent LLM Call"})
+            | question_intent_parser.with_config(
+                {"run_name": "Parse Question and Intent"}
+            )
+        ).with_config({"run_name": "Rephrase Question and Classify Intent"}),
+        intent_chain=(
+            intent_prompt.with_config({"run_name": "Intent Prompt"})
+            | llm.with_config({"run_name": "Intent Classification LLM"})
+            | StrOutputParser().with_config({"run_name": "Parse Intent Response"})
+        ).with_config({"run_name": "Classify Intent"}),
+        query_chain=(
+            query_prompt.with_config({"run_name": "Query Generation Prompt"})
+            | llm.with_config({"run_name": "Query Generation LLM"})
+            | PydanticOutputParser(pydantic_object=Query).with_config(
+                {"run_name": "Parse GraphQL Query"}
+            )
+        ).with_config({"run_name": "Generate GraphQL Query"}),
+        metadata_answer_chain=(
+            metadata_prompt.with_config({"run_name": "Metadata Prompt"})
+            | llm.with_config({"run_name": "Metadata Generation LLM"})
+            | StrOutputParser().with_config({"run_name": "Parse Metadata Response"})
+        ).with_config({"run_name": "Generate Metadata Response"}),
+    )
+
+
+class ResourceRegistry:
+    """Chat model clients and chains shared across reruns and sessions.
+
+    Entries are keyed by provider, model and a hash of the API key, so a
+    client (and its connection pool) is built once per credential.  Entries
+    unused for `idle_seconds` are dropped, as are the least recently used ones
+    past `max_entries`.
+    """
+
+    def __init__(
+        self,
+        idle_seconds: int = REGISTRY_IDLE_SECONDS,
+        max_entries: int = REGISTRY_MAX_ENTRIES,
+    ):
+        self.idle_seconds = idle_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (resources, last used)
+        self._entries: Dict[Tuple[str, str, str], Tuple[LLMResources, float]] = {}
+
+    def get(self, provider: str, model: str, api_key: str) -> LLMResources:
+        key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+        key = (provider, model, key_hash)
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], now)
+                return entry[0]
+
+        # Built without the lock so other sessions' lookups are not held up
+        resources = build_resources(provider, model, api_key)
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Another session built it first, share theirs
+                resources = entry[0]
+            self._entries[key] = (resources, now)
+            while len(self._entries) > self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][1])
+                del self._entries[oldest]
+        return resources
+
+    def _evict(self, now: float):
+        idle = [
+            key
+            for key, (_, last_used) in self._entries.items()
+            if now - last_used > self.idle_seconds
+        ]
+        for key in idle:
+            del self._entries[key]
+
+
+@st.cache_resource(show_spinner=False)
+def get_resource_registry() -> ResourceRegistry:
+    return ResourceRegistry()
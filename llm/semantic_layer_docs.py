@@ -1,9 +1,96 @@
+# stdlib
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from collections import defaultdict
+from typing import List
+
 # third party
+import numpy as np
 import streamlit as st
 from langchain.schema.document import Document
 from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 
+# first party
+from result_cache import CACHE_DIR
+
+VECTOR_INDEX_DIR = os.path.join(CACHE_DIR, "vector_indexes")
+# "local" (HashingEmbeddings) needs no API key but is opt-in: compare its recall
+# on your catalog with llm/benchmark_embeddings.py first
+EMBEDDINGS = os.environ.get("DBT_SL_EMBEDDINGS", "openai")
+
+# One writer per index directory at a time
+_index_locks = defaultdict(threading.Lock)
+
+
+class HashingEmbeddings(Embeddings):
+    """Local embeddings from hashed word and character n-grams.
+
+    Needs no network or API key and embeds a whole catalog in milliseconds.
+    Names like `order_total` are split into words, so questions phrased in
+    plain English still match, and character n-grams absorb plurals and typos.
+    """
+
+    def __init__(self, dimensions: int = 2048, ngram_range: tuple = (3, 5)):
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+        self.model = f"hashing-{dimensions}-{ngram_range[0]}-{ngram_range[1]}"
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        features = [f"w:{w}" for w in words]
+        features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        low, high = self.ngram_range
+        for word in words:
+            padded = f" {word} "
+            for n in range(low, high + 1):
+                features += [padded[i : i + n] for i in range(len(padded) - n + 1)]
+        return features
+
+    def _embed(self, text: str) -> List[float]:
+        # crc32 rather than `hash` so vectors are stable across processes
+        hashes = np.fromiter(
+            (zlib.crc32(f.encode("utf-8")) for f in self._features(text)),
+            dtype=np.uint32,
+        )
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        vector = np.bincount(
+            hashes % self.dimensions, weights=signs, minlength=self.dimensions
+        )
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+EMBEDDING_BACKENDS = {
+    "local": HashingEmbeddings,
+    "openai": OpenAIEmbeddings,
+}
+
+
+def get_embeddings(backend: str = None) -> Embeddings:
+    """Embeddings for the metadata index, chosen with `DBT_SL_EMBEDDINGS`.
+
+    Without an OpenAI key the default falls back to the local backend rather
+    than failing the index build.
+    """
+    if backend is None:
+        backend = EMBEDDINGS
+        if backend == "openai" and not os.environ.get("OPENAI_API_KEY"):
+            print("OPENAI_API_KEY is not set, using local embeddings")
+            backend = "local"
+    return EMBEDDING_BACKENDS[backend]()
+
 
 def _dict_to_list(d, metadata_type: str):
     docs = []
@@ -81,7 +168,56 @@ def create_metadata_documents(metrics: list[dict]):
     )
 
 
+def document_id(document: Document) -> str:
+    """Content hash of a document, used as its id in the vector index."""
+    content = json.dumps(
+        [document.page_content, document.metadata], sort_keys=True, default=str
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def build_vector_index(
+    metrics: list[dict], environment: str = None, embeddings: Embeddings = None
+) -> FAISS:
+    """Embed a user's semantic layer; safe to call off the script thread.
+
+    With an `environment`, the index is persisted to disk and later calls only
+    embed documents that were added or changed, and drop deleted ones.
+    """
+    documents = create_metadata_documents(metrics)
+    embeddings = embeddings or get_embeddings()
+    if environment is None:
+        return FAISS.from_documents(documents, embeddings)
+
+    by_id = {document_id(d): d for d in documents}
+    key = f"{environment}|{embeddings.model}".encode("utf-8")
+    path = os.path.join(VECTOR_INDEX_DIR, hashlib.sha256(key).hexdigest())
+    with _index_locks[path]:
+        try:
+            db = FAISS.load_local(
+                path, embeddings, allow_dangerous_deserialization=True
+            )
+        except (FileNotFoundError, RuntimeError):
+            # Not built yet (FAISS raises RuntimeError for a missing file)
+            db = None
+
+        if db is None:
+            db = FAISS.from_documents(list(by_id.values()), embeddings, ids=list(by_id))
+        else:
+            stored = set(db.index_to_docstore_id.values())
+            added = [i for i in by_id if i not in stored]
+            deleted = [i for i in stored if i not in by_id]
+            if added:
+                db.add_documents([by_id[i] for i in added], ids=added)
+            if deleted:
+                db.delete(deleted)
+            if not added and not deleted:
+                return db
+
+        db.save_local(path)
+    return db
+
+
 def create_chroma_db(metrics: list[dict]):
     """Create a Chroma database from a user's semantic layer."""
-    documents = create_metadata_documents(metrics)
-    st.session_state.db = FAISS.from_documents(documents, OpenAIEmbeddings())
+    st.session_state.db = build_vector_index(metrics)
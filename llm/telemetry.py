@@ -0,0 +1,208 @@
+# stdlib
+import atexit
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+# third party
+import streamlit as st
+from braintrust import init_logger
+
+TELEMETRY_PROJECT = "Conversational Analytics"
+TELEMETRY_QUEUE_SIZE = int(os.environ.get("DBT_SL_TELEMETRY_QUEUE_SIZE", 1000))
+TELEMETRY_BATCH_SIZE = int(os.environ.get("DBT_SL_TELEMETRY_BATCH_SIZE", 50))
+TELEMETRY_FLUSH_INTERVAL = float(os.environ.get("DBT_SL_TELEMETRY_FLUSH_INTERVAL", 2.0))
+
+
+class RecordedSpan:
+    """A span recorded in memory and sent to Braintrust later.
+
+    Supports the parts of the Braintrust span API the pages and
+    `BraintrustCallbackHandler` use: `log`, nested `start_span`, `end` and use
+    as a context manager.  The root span gets its id up front so feedback can
+    refer to it before anything is sent.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        type: str = None,
+        id: str = None,
+        on_end: Callable[["RecordedSpan"], None] = None,
+    ):
+        self.name = name
+        self.type = type
+        self.id = id
+        self.events: List[Dict[str, Any]] = []
+        self.children: List["RecordedSpan"] = []
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+        self._on_end = on_end
+
+    def log(self, **event):
+        self.events.append(event)
+
+    def start_span(
+        self, name: str = None, type: str = None, start_time: float = None, **event
+    ) -> "RecordedSpan":
+        child = RecordedSpan(name, type)
+        if start_time is not None:
+            child.start_time = start_time
+        # Braintrust-only options; the rest is the span's first event
+        for option in ("span_attributes", "set_current", "parent"):
+            event.pop(option, None)
+        event = {k: v for k, v in event.items() if v is not None}
+        if event:
+            child.log(**event)
+        self.children.append(child)
+        return child
+
+    def end(self, end_time: float = None):
+        if self.end_time is None:
+            self.end_time = end_time or time.time()
+            if self._on_end is not None:
+                self._on_end(self)
+
+    def __enter__(self) -> "RecordedSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.log(error=repr(exc))
+        self.end()
+
+    def replay(self, parent):
+        """Send the span and its children under `parent` (a logger or span)."""
+        kwargs = {"name": self.name, "type": self.type, "start_time": self.start_time}
+        if self.id is not None:
+            kwargs["id"] = self.id
+        span = parent.start_span(**kwargs)
+        for event in self.events:
+            span.log(**event)
+        # Children may still be added by work finishing in the background
+        for child in list(self.children):
+            child.replay(span)
+        span.end(end_time=self.end_time)
+
+
+class Telemetry:
+    """Bounded queue of telemetry events sent to Braintrust off the script thread.
+
+    Finished root spans and feedback are queued without blocking; when the
+    queue is full, events are dropped and counted rather than slowing down
+    the user's request.  A worker thread sends events in batches and the
+    queue is flushed on shutdown.
+    """
+
+    def __init__(
+        self,
+        project: str = TELEMETRY_PROJECT,
+        api_key: str = None,
+        max_size: int = TELEMETRY_QUEUE_SIZE,
+        batch_size: int = TELEMETRY_BATCH_SIZE,
+        flush_interval: float = TELEMETRY_FLUSH_INTERVAL,
+    ):
+        self.project = project
+        self.api_key = api_key
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self._logger = None
+        self._lock = threading.Lock()
+        self.counters = {"queued": 0, "sent": 0, "dropped": 0, "failed": 0}
+        self.high_water = 0
+        self._thread = threading.Thread(
+            target=self._run, name="sl-telemetry", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def _enqueue(self, event: Callable):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._count("dropped")
+        else:
+            self._count("queued")
+            with self._lock:
+                self.high_water = max(self.high_water, self._queue.qsize())
+
+    def start_span(self, name: str, type: str = None) -> RecordedSpan:
+        """Root span; sent once it ends."""
+        return RecordedSpan(
+            name,
+            type,
+            id=str(uuid.uuid4()),
+            on_end=lambda span: self._enqueue(lambda logger: span.replay(logger)),
+        )
+
+    def log_feedback(self, **feedback):
+        self._enqueue(lambda logger: logger.log_feedback(**feedback))
+
+    def _get_logger(self):
+        if self._logger is None:
+            self._logger = init_logger(project=self.project, api_key=self.api_key)
+        return self._logger
+
+    def _send(self, batch: List[Callable]):
+        try:
+            logger = self._get_logger()
+        except Exception as e:
+            print(f"Error initializing telemetry logger; {e}")
+            self._count("failed", len(batch))
+            return
+
+        for event in batch:
+            try:
+                event(logger)
+            except Exception as e:
+                print(f"Error sending telemetry; {e}")
+                self._count("failed")
+            else:
+                self._count("sent")
+        try:
+            logger.flush()
+        except Exception as e:
+            print(f"Error flushing telemetry; {e}")
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._send(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 10):
+        """Wait (up to `timeout` seconds) for queued events to be sent."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self.counters,
+                "pending": self._queue.qsize(),
+                "high_water": self.high_water,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_telemetry() -> Telemetry:
+    return Telemetry(api_key=os.environ.get("BRAINTRUST_API_KEY"))
@@ -6,16 +6,18 @@ from typing import Dict
 import streamlit as st
 
 # first party
-from client import get_query_results
+from bootstrap import sync_bootstrap
+from catalog import sync_catalog
+from catalog_index import get_catalog_index
+from dimension_values import get_dimension_values_store
 from helpers import (
     construct_cli_command,
     create_graphql_code,
     create_python_sdk_code,
     create_tabs,
-    get_shared_elements,
-    to_arrow_table,
+    lowercase_columns,
+    run_query,
 )
-from queries import GRAPHQL_QUERIES
 from schema import Query, QueryLoader
 
 st.set_page_config(
@@ -28,6 +30,9 @@ if "conn" not in st.session_state or st.session_state.conn is None:
     st.warning("Go to home page and enter your JDBC URL")
     st.stop()
 
+sync_catalog()
+sync_bootstrap()
+
 if "metric_dict" not in st.session_state:
     st.warning(
         "No metrics found.  Ensure your project has metrics defined and a production "
@@ -35,6 +40,7 @@ if "metric_dict" not in st.session_state:
     )
     st.stop()
 
+catalog_index = get_catalog_index()
 
 OPERATORS = {
     "CATEGORICAL": ["IN", "NOT IN", "=", "<>", "LIKE", "ILIKE"],
@@ -65,7 +71,29 @@ def get_time_kwargs(operator: str) -> Dict:
     }
 
 
-def get_categorical_kwargs(dimension: str, operator: str):
+def search_dimension_values(dimension: str, i: int):
+    """Typeahead for dimensions with too many values to list at once."""
+    store = get_dimension_values_store()
+    prefix = st.text_input(
+        label="Search values",
+        key=f"where_search_{i}",
+        placeholder="Type the start of a value",
+    )
+    more = st.session_state.get(f"where_more_{i}", False)
+    values, exhausted = store.search(st.session_state.conn, dimension, prefix, more)
+
+    # Keep selections made under an earlier search available as options
+    selected = st.session_state.get(f"where_condition_{i}")
+    if selected is not None:
+        selected = selected if isinstance(selected, list) else [selected]
+        values = [v for v in selected if v not in values] + values
+
+    if not exhausted:
+        st.button("Load more values", key=f"where_more_{i}")
+    return values
+
+
+def get_categorical_kwargs(dimension: str, operator: str, i: int):
     if operator in ["IN", "NOT IN"]:
         input = "multiselect"
     elif operator in ["LIKE", "ILIKE"]:
@@ -75,19 +103,16 @@ def get_categorical_kwargs(dimension: str, operator: str):
 
     kwargs = {"input": input}
     if input != "text_input":
-        payload = {
-            "query": GRAPHQL_QUERIES["dimension_values"],
-            "variables": {
-                "groupBy": [{"name": dimension}],
-                "metrics": [],
-            },
-        }
-        with st.spinner("Retrieving dimension values..."):
-            data = get_query_results(
-                payload, key="createDimensionValuesQuery", progress=False
-            )
-            df = to_arrow_table(data["arrowResult"])
-        kwargs["options"] = sorted(df.iloc[:, 0].tolist())
+        store = get_dimension_values_store()
+        # Prefetched for every filter row, so this is normally a memory hit
+        values = store.fetch(st.session_state.conn, [dimension])[dimension]
+        if isinstance(values, Exception):
+            st.error(f"Unable to retrieve values for {dimension}: {values}")
+            values = []
+        if store.is_searchable(st.session_state.conn, dimension):
+            kwargs["options"] = search_dimension_values(dimension, i)
+        else:
+            kwargs["options"] = values or []
         kwargs["label"] = (
             "Select Option" if input == "selectbox" else "Select Option(s)"
         )
@@ -97,28 +122,16 @@ def get_categorical_kwargs(dimension: str, operator: str):
     return kwargs
 
 
-def get_condition_kwargs(dimension: str, operator: str):
+def get_condition_kwargs(dimension: str, operator: str, i: int):
     dimension_type = get_dimension_type(dimension)
     if dimension_type == "TIME":
         return get_time_kwargs(operator)
 
-    return get_categorical_kwargs(dimension, operator)
+    return get_categorical_kwargs(dimension, operator, i)
 
 
 def get_dimension_type(dimension: str):
-    try:
-        return st.session_state.dimension_dict[dimension]["type"]
-    except KeyError:
-        return "TIME"
-
-
-def get_time_length(interval):
-    time_lengths = {"day": 1, "week": 7, "month": 30, "quarter": 90, "year": 365}
-    return time_lengths.get(interval, 0)
-
-
-def sort_by_time_length(time_intervals):
-    return sorted(time_intervals, key=lambda x: get_time_length(x))
+    return catalog_index.dimension_type(dimension)
 
 
 def add_where_state():
@@ -128,7 +141,7 @@ def add_where_state():
 def subtract_where_state():
     st.session_state.where_items -= 1
     i = st.session_state.where_items
-    for component in ["column", "operator", "condition", "add", "subtract"]:
+    for component in ["column", "operator", "condition", "search", "add", "subtract"]:
         where_component = f"where_{component}_{i}"
         if where_component in st.session_state:
             del st.session_state[where_component]
@@ -164,60 +177,44 @@ with ad_hoc_tab:
 
     col1, col2 = st.columns(2)
 
-    # Retrieve metrics from dictionary
+    # Retrieve metrics from the catalog index (already sorted)
     col1.multiselect(
         label="Select Metric(s)",
-        options=sorted(st.session_state.metric_dict.keys()),
+        options=catalog_index.metrics,
         default=None,
         key="selected_metrics",
         placeholder="Select a Metric",
     )
 
     # Retrieve unique dimensions based on overlap of metrics selected
-    all_dimensions = [
-        v["dimensions"]
-        for k, v in st.session_state.metric_dict.items()
-        if k in st.session_state.selected_metrics
-    ]
-    unique_dimensions = get_shared_elements(all_dimensions)
+    unique_dimensions = catalog_index.compatible_dimensions(
+        st.session_state.selected_metrics
+    )
 
     # A cumulative metric needs to always be viewed over time so we select metric_time
-    requires_metric_time = any(
-        [
-            v["requiresMetricTime"]
-            for k, v in st.session_state.metric_dict.items()
-            if k in st.session_state.get("selected_metrics", [])
-        ]
+    requires_metric_time = catalog_index.requires_metric_time(
+        st.session_state.get("selected_metrics", [])
     )
 
     default_options = ["metric_time"] if requires_metric_time else None
 
     col2.multiselect(
         label="Select Dimension(s)",
-        options=sorted(unique_dimensions),
+        options=unique_dimensions,
         default=default_options,
         key="selected_dimensions",
         placeholder="Select a dimension",
     )
 
     # Only add grain if a time dimension has been selected
-    dimension_types = set(
-        [
-            st.session_state.dimension_dict[dim]["type"].lower()
-            for dim in st.session_state.get("selected_dimensions", [])
-        ]
+    has_time_dimension = catalog_index.has_time_dimension(
+        st.session_state.get("selected_dimensions", [])
     )
-    if "time" in dimension_types or requires_metric_time:
+    if has_time_dimension or requires_metric_time:
         col1, col2 = st.columns(2)
-        grains = [
-            st.session_state.metric_dict[metric]["queryableGranularities"]
-            for metric in st.session_state.selected_metrics
-        ]
         col1.selectbox(
             label="Select Grain",
-            options=sort_by_time_length(
-                [g.strip().lower() for g in get_shared_elements(grains)]
-            ),
+            options=catalog_index.shared_grains(st.session_state.selected_metrics),
             key="selected_grain",
         )
 
@@ -226,12 +223,30 @@ with ad_hoc_tab:
         if st.session_state.where_items == 0:
             st.button("Add Filters", on_click=add_where_state, key="static_filter_add")
         else:
+            # Fetch values for every categorical filter column at once instead
+            # of one blocking query per row
+            filter_dimensions = [
+                st.session_state.get(f"where_column_{i}", unique_dimensions[0])
+                for i in range(st.session_state.where_items)
+                if unique_dimensions
+            ]
+            filter_dimensions = [
+                d
+                for d in filter_dimensions
+                if d in unique_dimensions and get_dimension_type(d) != "TIME"
+            ]
+            if filter_dimensions:
+                with st.spinner("Retrieving dimension values..."):
+                    get_dimension_values_store().fetch(
+                        st.session_state.conn, filter_dimensions
+                    )
+
             for i in range(st.session_state.where_items):
                 col1, col2, col3, col4, col5 = st.columns([3, 1, 3, 1, 1])
                 with col1:
                     st.selectbox(
                         label="Select Column",
-                        options=sorted(unique_dimensions),
+                        options=unique_dimensions,
                         key=f"where_column_{i}",
                     )
 
@@ -248,7 +263,7 @@ with ad_hoc_tab:
                 operator = st.session_state[f"where_operator_{i}"]
 
                 with col3:
-                    condition_kwargs = get_condition_kwargs(dimension, operator)
+                    condition_kwargs = get_condition_kwargs(dimension, operator, i)
                     input = condition_kwargs.pop("input")
                     getattr(st, input)(**condition_kwargs, key=f"where_condition_{i}")
 
@@ -324,13 +339,16 @@ with ad_hoc_tab:
             st.warning("You must select at least one metric!")
             st.stop()
 
-        payload = {"query": query.gql, "variables": query.variables}
-        data = get_query_results(payload)
-        df = to_arrow_table(data["arrowResult"])
-        df.columns = [col.lower() for col in df.columns]
+        store = get_dimension_values_store()
+        for i in range(st.session_state.where_items):
+            dimension = st.session_state.get(f"where_column_{i}")
+            if dimension is not None and get_dimension_type(dimension) != "TIME":
+                store.record_use(st.session_state.conn, dimension)
+
+        table, sql = run_query(query=query, to_pandas=False)
         st.session_state.query_qm = query
-        st.session_state.df_qm = df
-        st.session_state.compiled_sql_qm = data["sql"]
+        st.session_state.df_qm = lowercase_columns(table)
+        st.session_state.compiled_sql_qm = sql
 
     create_tabs(st.session_state, "qm")
 
@@ -379,12 +397,9 @@ with saved_query_tab:
             tab3.code(sdk_code, language="python")
 
         if st.button("Submit Query", key="submit_query_sq"):
-            payload = {"query": query.gql, "variables": query.variables}
-            data = get_query_results(payload)
-            df = to_arrow_table(data["arrowResult"])
-            df.columns = [col.lower() for col in df.columns]
+            table, sql = run_query(query=query, to_pandas=False)
             st.session_state.query_sq = query
-            st.session_state.df_sq = df
-            st.session_state.compiled_sql_sq = data["sql"]
+            st.session_state.df_sq = lowercase_columns(table)
+            st.session_state.compiled_sql_sq = sql
 
         create_tabs(st.session_state, "sq")
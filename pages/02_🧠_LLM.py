@@ -1,23 +1,27 @@
 # stdlib
+import contextvars
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
 
 # third party
 import streamlit as st
-from braintrust import init_logger
 from braintrust_langchain import BraintrustCallbackHandler, set_global_handler
-from langchain.chat_models import init_chat_model
 from langchain_community.chat_message_histories import StreamlitChatMessageHistory
 from langchain_core.messages import AIMessage, HumanMessage
-from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
 from streamlit_feedback import streamlit_feedback
 
 # first party
-from client import get_query_results
-from helpers import create_tabs, to_arrow_table
-from llm.prompt import intent_prompt, metadata_prompt, query_prompt, rephrase_prompt
+from bootstrap import sync_bootstrap
+from catalog import sync_catalog
+from catalog_index import get_catalog_index
+from helpers import create_tabs, lowercase_columns, run_query
+from llm.catalog_context import select_catalog_context, token_budget
 from llm.providers import MODELS
-from schema import Query
+from llm.query_cache import cache_scope, get_query_cache
+from llm.registry import get_resource_registry
+from llm.telemetry import get_telemetry
 
 st.set_page_config(
     page_title="LLM",
@@ -25,16 +29,17 @@ st.set_page_config(
     layout="wide",
 )
 
-# Initialize Braintrust logger and handler
-logger = init_logger(project="Conversational Analytics", api_key=os.environ.get("BRAINTRUST_API_KEY"))
-handler = BraintrustCallbackHandler()
-set_global_handler(handler)
+# Spans and feedback are queued and sent to Braintrust in the background
+telemetry = get_telemetry()
 
 
 if "conn" not in st.session_state or st.session_state.conn is None:
     st.warning("Go to home page and enter your JDBC URL")
     st.stop()
 
+sync_catalog()
+sync_bootstrap()
+
 if "metric_dict" not in st.session_state:
     st.warning(
         "No metrics found.  Ensure your project has metrics defined and a production "
@@ -91,13 +96,53 @@ model_name = st.sidebar.selectbox(
     index=DEFAULT_MODEL_INDEX,
 )
 
+PIPELINES = {
+    "Combined": (
+        "Skip rephrasing without chat history, otherwise rephrase and classify "
+        "intent in one call"
+    ),
+    "Speculative": (
+        "Like Combined, but generate the query and retrieve metadata while the "
+        "intent is classified and discard whichever isn't needed (follow-ups "
+        "only retrieve metadata ahead)"
+    ),
+    "Sequential": "Rephrase, classify intent, then answer, one call at a time",
+}
+
+pipeline = st.sidebar.selectbox(
+    label="Pipeline",
+    options=list(PIPELINES.keys()),
+    help="\n\n".join(f"**{k}**: {v}" for k, v in PIPELINES.items()),
+)
+
 metadata = {
     "environment_id": st.session_state.conn.params["environmentid"],
     "host": st.session_state.conn.host,
     "provider_name": provider_name,
     "model_name": model_name,
+    "pipeline": pipeline,
 }
 
+use_query_cache = st.sidebar.toggle(
+    label="Reuse queries for similar questions",
+    value=False,
+    help=(
+        "Skip query generation when a question is close enough to one already "
+        "answered for this environment and catalog version"
+    ),
+)
+if use_query_cache:
+    # Built only when enabled, since it needs an embeddings backend
+    query_cache = get_query_cache()
+    query_cache_scope = cache_scope(
+        st.session_state.conn, st.session_state.get("catalog_hash")
+    )
+    cache_stats = query_cache.stats()
+    st.sidebar.caption(
+        f"Query cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%} hit rate)"
+    )
+
 MODEL_INFO = MODELS[provider_name][model_name]
 st.sidebar.markdown(
     f"**Description**: {MODEL_INFO['description']}\n\n"
@@ -115,12 +160,15 @@ api_key = st.sidebar.text_input(
     on_change=set_llm_api_key,
 )
 
-llm = init_chat_model(
-    model_name,
-    model_provider=provider_name,
-    temperature=0,
-    api_key=st.session_state.get("_llm_api_key", ""),
+# Built once per provider, model and API key, then reused across reruns
+resources = get_resource_registry().get(
+    provider_name, model_name, st.session_state.get("_llm_api_key", "")
 )
+rephrase_chain = resources.rephrase_chain
+question_intent_chain = resources.question_intent_chain
+intent_chain = resources.intent_chain
+query_chain = resources.query_chain
+metadata_answer_chain = resources.metadata_answer_chain
 
 if len(msgs.messages) == 0 or reset_history:
     msgs.clear()
@@ -142,40 +190,100 @@ for msg in msgs.messages:
         else:
             st.chat_message(avatars[msg.type]).write(msg.content)
 
-# Create chains with custom names
-rephrase_chain = (
-    rephrase_prompt.with_config({"run_name": "Rephrase Prompt"}) 
-    | llm.with_config({"run_name": "Rephrase LLM Call"}) 
-    | StrOutputParser().with_config({"run_name": "Parse Rephrase Response"})
-).with_config({"run_name": "Rephrase User Question"})
-
-intent_chain = (
-    intent_prompt.with_config({"run_name": "Intent Prompt"}) 
-    | llm.with_config({"run_name": "Intent Classification LLM"}) 
-    | StrOutputParser().with_config({"run_name": "Parse Intent Response"})
-).with_config({"run_name": "Classify Intent"})
-
-query_chain = (
-    query_prompt.with_config({"run_name": "Query Generation Prompt"}) 
-    | llm.with_config({"run_name": "Query Generation LLM"}) 
-    | PydanticOutputParser(pydantic_object=Query).with_config({"run_name": "Parse GraphQL Query"})
-).with_config({"run_name": "Generate GraphQL Query"})
-
-retriever = st.session_state.db.as_retriever(
-    search_type="mmr",
-    search_kwargs={
-        "k": 6,
-        "fetch_k": 20,
-        "lambda_mult": 0.6,
-    },
-).with_config({"run_name": "Retrieve Semantic Layer Metadata"})
-
-metadata_chain = (
-    {"context": retriever, "question": RunnablePassthrough()}
-    | metadata_prompt.with_config({"run_name": "Metadata Prompt"})
-    | llm.with_config({"run_name": "Metadata Generation LLM"})
-    | StrOutputParser().with_config({"run_name": "Parse Metadata Response"})
-).with_config({"run_name": "Generate Metadata Response"})
+if "db" not in st.session_state:
+    with st.spinner("Indexing semantic layer metadata..."):
+        sync_bootstrap(wait_for=["db"])
+
+if "db" not in st.session_state:
+    st.warning(
+        "Semantic layer metadata could not be indexed.  Try reloading the app."
+    )
+    st.stop()
+
+# Rebuilt only when the index itself changes
+if st.session_state.get("retriever_db") is not st.session_state.db:
+    st.session_state.retriever = st.session_state.db.as_retriever(
+        search_type="mmr",
+        search_kwargs={
+            "k": 6,
+            "fetch_k": 20,
+            "lambda_mult": 0.6,
+        },
+    ).with_config({"run_name": "Retrieve Semantic Layer Metadata"})
+    st.session_state.retriever_db = st.session_state.db
+retriever = st.session_state.retriever
+
+
+catalog_index = get_catalog_index()
+catalog_budget = token_budget(MODEL_INFO)
+
+
+def query_chain_input(question: str):
+    # Only the metrics and dimensions relevant to the question, so the prompt
+    # stays within the model's context window however large the catalog is
+    metrics, dimensions = select_catalog_context(
+        question, st.session_state.db, catalog_index, catalog_budget
+    )
+    return {
+        "metrics": ", ".join(metrics),
+        "dimensions": ", ".join(dimensions),
+        "question": question,
+    }
+
+
+# Speculative calls in flight across every session
+SPECULATION_SLOTS = int(os.environ.get("DBT_SL_SPECULATION_SLOTS", 4))
+
+
+@st.cache_resource(show_spinner=False)
+def get_speculation_executor():
+    # One thread per slot, so speculation never queues behind other sessions
+    return (
+        ThreadPoolExecutor(
+            max_workers=SPECULATION_SLOTS, thread_name_prefix="llm-speculation"
+        ),
+        threading.BoundedSemaphore(SPECULATION_SLOTS),
+    )
+
+
+def speculate(fn, *args) -> Optional[Future]:
+    """Run `fn` in the background if a speculation slot is free.
+
+    A losing branch can't be stopped once its LLM call has started, so the
+    number in flight is capped; without a free slot the step just runs when
+    it's needed.
+    """
+    executor, slots = get_speculation_executor()
+    if not slots.acquire(blocking=False):
+        return None
+
+    try:
+        # Copy the context so chain runs stay attached to the current trace
+        future = executor.submit(contextvars.copy_context().run, fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda f: slots.release())
+    return future
+
+
+def start_speculation(input: str, query_input: dict = None):
+    """Start both possible answers before the intent is known."""
+    speculation = {
+        "context": speculate(
+            retriever.invoke,
+            input,
+            {"run_name": "Retrieve Semantic Layer Metadata (Speculative)"},
+        ),
+    }
+    if query_input is not None:
+        speculation["query"] = speculate(
+            query_chain.invoke,
+            query_input,
+            {"run_name": "Generate GraphQL Query (Speculative)"},
+        )
+    return {name: future for name, future in speculation.items() if future}
+
 
 if input := st.chat_input(placeholder="What is total revenue in June?"):
     if st.session_state.get("_llm_api_key", None) is None:
@@ -185,57 +293,109 @@ if input := st.chat_input(placeholder="What is total revenue in June?"):
     msgs.add_user_message(input)
     
     # Start a single trace for the entire conversation
-    with logger.start_span(name="Conversational Analytics", type="task") as conversation_span:
+    with telemetry.start_span(name="Conversational Analytics", type="task") as conversation_span:
         conversation_span.log(input={"input": input, "chat_history": human_messages})
+        # Chain steps are recorded under the conversation span and queued with it
+        set_global_handler(BraintrustCallbackHandler(logger=conversation_span))
         
         with st.status("Thinking...", expanded=True) as status:
-            # Step 1: Rephrase question
-            with conversation_span.start_span(name="Rephrase Question", type="llm") as rephrase_span:
-                st.write("Rephrasing question ... ")
-                rephrase_span.log(input={"chat_history": human_messages, "input": input})
-                question = rephrase_chain.invoke(
-                    {"chat_history": human_messages, "input": input},
-                    config={"run_name": "Rephrase User Question"}
-                )
-                rephrase_span.log(output=question)
-            
-            # Step 2: Determine intent
-            with conversation_span.start_span(name="Determine Intent", type="llm") as intent_span:
-                st.write("Determining intent...")
-                intent_span.log(input={"question": question})
-                intent = intent_chain.invoke(
-                    {"question": question},
-                    config={"run_name": "Classify Intent"}
-                )
-                intent_span.log(output=intent)
+            speculation = {}
+            cached = None
+            query_input = None
+            if pipeline != "Sequential" and human_messages:
+                if pipeline == "Speculative":
+                    # Metadata is retrieved for the raw input, so it can start
+                    # now; the query needs the rephrased question
+                    speculation = start_speculation(input)
+
+                # Steps 1 and 2 in a single call
+                with conversation_span.start_span(name="Rephrase Question and Determine Intent", type="llm") as question_intent_span:
+                    st.write("Rephrasing question and determining intent...")
+                    question_intent_span.log(input={"chat_history": human_messages, "input": input})
+                    question_intent = question_intent_chain.invoke(
+                        {"chat_history": human_messages, "input": input},
+                        config={"run_name": "Rephrase Question and Classify Intent"}
+                    )
+                    question, intent = question_intent.question, question_intent.intent
+                    st.write(f"{question} ({intent})")
+                    question_intent_span.log(output=question_intent.model_dump())
+            else:
+                # Step 1: Rephrase question, unless there is nothing to rephrase against
+                if pipeline == "Sequential":
+                    with conversation_span.start_span(name="Rephrase Question", type="llm") as rephrase_span:
+                        st.write("Rephrasing question ... ")
+                        rephrase_span.log(input={"chat_history": human_messages, "input": input})
+                        question = st.write_stream(
+                            rephrase_chain.stream(
+                                {"chat_history": human_messages, "input": input},
+                                config={"run_name": "Rephrase User Question"}
+                            )
+                        )
+                        rephrase_span.log(output=question)
+                else:
+                    question = input
+
+                if pipeline == "Speculative":
+                    if use_query_cache:
+                        cached = query_cache.lookup(query_cache_scope, question)
+                    if cached is None:
+                        query_input = query_chain_input(question)
+                    speculation = start_speculation(input, query_input)
+
+                # Step 2: Determine intent
+                with conversation_span.start_span(name="Determine Intent", type="llm") as intent_span:
+                    st.write("Determining intent...")
+                    intent_span.log(input={"question": question})
+                    intent = st.write_stream(
+                        intent_chain.stream(
+                            {"question": question},
+                            config={"run_name": "Classify Intent"}
+                        )
+                    )
+                    intent_span.log(output=intent)
+
+            if speculation:
+                # Drop the losing branch; it finishes in the background and
+                # frees its slot
+                speculation.pop("context" if intent == "query" else "query", None)
             
             if intent == "query":
                 # Step 3a: Generate semantic layer query
                 with conversation_span.start_span(name="Generate SL Query", type="llm") as query_span:
                     st.write("Creating semantic layer request...")
-                    query_input = {
-                        "metrics": ", ".join(list(st.session_state.metric_dict.keys())),
-                        "dimensions": ", ".join(
-                            list(st.session_state.dimension_dict.keys())
-                        ),
-                        "question": question,
-                    }
+                    query_input = query_input or query_chain_input(question)
                     query_span.log(input=query_input)
-                    query = query_chain.invoke(
-                        query_input, 
-                        config={"run_name": "Generate GraphQL Query"}
+                    if use_query_cache and cached is None and "query" not in speculation:
+                        cached = query_cache.lookup(query_cache_scope, question)
+                    if cached is not None:
+                        query, similarity = cached
+                        st.write(f"Reusing the query for a similar question ({similarity:.2f})...")
+                    elif "query" in speculation:
+                        query = speculation["query"].result()
+                    else:
+                        query = query_chain.invoke(
+                            query_input, 
+                            config={"run_name": "Generate GraphQL Query"}
+                        )
+                    query_span.log(
+                        output=query.model_dump(),
+                        metadata={
+                            "speculative": "query" in speculation,
+                            "cache_hit": cached is not None,
+                            "cache_similarity": cached[1] if cached else None,
+                        },
                     )
-                    query_span.log(output=query.model_dump())
                 
                 # Step 3b: Execute semantic layer query
                 with conversation_span.start_span(name="Execute SL Query", type="function") as execute_span:
-                    payload = {"query": query.gql, "variables": query.variables}
-                    execute_span.log(input=payload)
+                    execute_span.log(input=query.payload)
                     st.write("Querying semantic layer...")
                     try:
-                        data = get_query_results(payload, source="streamlit-llm")
+                        table, sql = run_query(
+                            query=query, source="streamlit-llm", to_pandas=False
+                        )
                         execute_span.log(
-                            output={"sql": data["sql"], "row_count": len(data.get("arrowResult", []))},
+                            output={"sql": sql, "row_count": table.num_rows},
                             metadata={"source": "streamlit-llm"}
                         )
                     except Exception as e:
@@ -243,13 +403,15 @@ if input := st.chat_input(placeholder="What is total revenue in June?"):
                         st.warning(e)
                         status.update(label="Failed", state="error")
                         st.stop()
+
+                # Only queries that ran are worth reusing
+                if use_query_cache and cached is None:
+                    query_cache.add(query_cache_scope, question, query)
                 
-                df = to_arrow_table(data["arrowResult"])
-                df.columns = [col.lower() for col in df.columns]
                 run_id = conversation_span.id
                 setattr(st.session_state, f"query_{run_id}", query)
-                setattr(st.session_state, f"df_{run_id}", df)
-                setattr(st.session_state, f"compiled_sql_{run_id}", data["sql"])
+                setattr(st.session_state, f"df_{run_id}", lowercase_columns(table))
+                setattr(st.session_state, f"compiled_sql_{run_id}", sql)
                 conversation_span.log(
                     output=query.model_dump(),
                     metadata={
@@ -264,25 +426,44 @@ if input := st.chat_input(placeholder="What is total revenue in June?"):
                 with conversation_span.start_span(name="Retrieve Metadata", type="llm") as metadata_span:
                     st.write("Retrieving metadata...")
                     metadata_span.log(input=input)
-                    content = metadata_chain.invoke(
-                        input, 
-                        config={"run_name": "Generate Metadata Response"}
+                    if "context" in speculation:
+                        context = speculation["context"].result()
+                    else:
+                        context = retriever.invoke(
+                            input,
+                            config={"run_name": "Retrieve Semantic Layer Metadata"}
+                        )
+                    metadata_span.log(
+                        output=[d.page_content for d in context],
+                        metadata={"speculative": "context" in speculation},
                     )
-                    metadata_span.log(output=content)
                 
                 run_id = conversation_span.id
-                conversation_span.log(
-                    output=content, 
-                    metadata={
-                        "intent": intent,
-                        "rephrased_question": question,
-                        "chat_history": human_messages,
-                        **metadata,
-                    }
-                )
 
             status.update(label="Complete!", expanded=False, state="complete")
 
+        if intent != "query":
+            # Step 4: Stream the answer into the chat as it is generated
+            with conversation_span.start_span(name="Generate Metadata Response", type="llm") as answer_span:
+                answer_span.log(input={"context": [d.page_content for d in context], "question": input})
+                content = st.chat_message("assistant").write_stream(
+                    metadata_answer_chain.stream(
+                        {"context": context, "question": input},
+                        config={"run_name": "Generate Metadata Response"}
+                    )
+                )
+                answer_span.log(output=content)
+
+            conversation_span.log(
+                output=content, 
+                metadata={
+                    "intent": intent,
+                    "rephrased_question": question,
+                    "chat_history": human_messages,
+                    **metadata,
+                }
+            )
+
     human_messages.append(HumanMessage(content=input))
     st.session_state.last_run = run_id
 
@@ -295,7 +476,7 @@ if input := st.chat_input(placeholder="What is total revenue in June?"):
             )
         )
     else:
-        st.markdown(content)
+        # Already streamed into the chat above
         msgs.add_ai_message(
             AIMessage(
                 content=content,
@@ -321,7 +502,7 @@ if st.session_state.get("last_run"):
         if comment_text and comment_text.strip():
             tags.append("User Comment")
         
-        logger.log_feedback(
+        telemetry.log_feedback(
             id=str(st.session_state.last_run),
             scores={"user_feedback": score_value},
             comment=comment_text,
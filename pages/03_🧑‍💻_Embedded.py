@@ -1,17 +1,29 @@
 # stdlib
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 # third party
 import pandas as pd
 import streamlit as st
 import streamlit_authenticator as stauth
 import yaml
-from dbtsl import SemanticLayerClient
 from yaml.loader import SafeLoader
 
 # first party
 from client import get_connection_attributes
+from dashboard_planner import (
+    DAY,
+    PLAN_MODES,
+    DashboardPlanner,
+    Plan,
+    View,
+    clamp_range,
+    history_days,
+    to_date,
+)
+from sdk_client import get_sdk_client
+from tenant_cache import TenantCache
 
 st.set_page_config(
     page_title="Embedded Analytics",
@@ -41,17 +53,32 @@ QUERIES = {
     },
 }
 
+CUSTOMER_ATTRIBUTES = QUERIES["totals"]["group_by"][1:]
+
+# First and last day of a customer's history, with their attributes; enough to
+# plan the dashboard without loading the history itself
+HISTORY_QUERIES = {
+    "first_day": {
+        "metrics": ["total_revenue"],
+        "group_by": ["metric_time__day", *CUSTOMER_ATTRIBUTES],
+        "order_by": ["metric_time__day"],
+        "limit": 1,
+    },
+    "last_day": {
+        "metrics": ["total_revenue"],
+        "group_by": ["metric_time__day", *CUSTOMER_ATTRIBUTES],
+        "order_by": ["-metric_time__day"],
+        "limit": 1,
+    },
+}
+
 conn = get_connection_attributes(st.secrets["JDBC_URL"])
 
-semantic_layer_client = SemanticLayerClient(
-    environment_id=conn.params["environmentid"],
-    auth_token=conn.auth_header.replace("Bearer ", ""),
-    host=conn.host.replace("https://", ""),
-)
+# One client and session for the whole process, shared by every rerun
+semantic_layer_client = get_sdk_client(conn)
 
 
-@st.cache_data(show_spinner=False)
-def retrieve_data(
+async def retrieve_data(
     user_id: int,
     *,
     metrics: List[str] = None,
@@ -59,26 +86,69 @@ def retrieve_data(
     where: List[str] = None,
     order_by: List[str] = None,
     limit: int = None,
-) -> Dict:
+) -> pd.DataFrame:
     user_filter = f"{{{{ Dimension('customer__customer_id') }}}} = {user_id}"
-    if not where:
-        where = [user_filter]
-    else:
-        where.append(user_filter)
-    with semantic_layer_client.session():
-        table = semantic_layer_client.query(
-            metrics=metrics,
-            group_by=group_by or [],
-            where=where,
-            order_by=order_by or [],
-            limit=limit,
-        )
+    where = [*(where or []), user_filter]
+    table = await semantic_layer_client.query(
+        metrics=metrics,
+        group_by=group_by or [],
+        where=where,
+        order_by=order_by or [],
+        limit=limit,
+    )
 
     df = table.to_pandas()
     df.columns = [col.lower() for col in df.columns]
     return df
 
 
+def load_query(user_id: int, name: str) -> Future:
+    query = {**QUERIES, **HISTORY_QUERIES}[name]
+    return semantic_layer_client.submit(retrieve_data(user_id, **query))
+
+
+def load_view(user_id: int, view: View) -> Future:
+    return semantic_layer_client.submit(retrieve_data(user_id, **view.query(QUERIES)))
+
+
+@st.cache_resource(show_spinner=False)
+def get_planner() -> DashboardPlanner:
+    return DashboardPlanner()
+
+
+@st.cache_resource(show_spinner=False)
+def get_dashboard_cache(user_ids: Tuple[int, ...]) -> TenantCache:
+    """Dashboard results for every customer, kept warm in the background.
+
+    The history bounds are always kept warm; a full query only when the
+    planner would run it locally for that customer.
+    """
+    planner = get_planner()
+
+    def should_warm(user_id: int, name: str) -> bool:
+        if name in HISTORY_QUERIES:
+            return True
+
+        first, last = (cache.peek(user_id, n) for n in HISTORY_QUERIES)
+        if first is None or last is None or first.empty:
+            return False
+
+        days = history_days(first.loc[0, DAY], last.loc[0, DAY])
+        return not planner.plan(name, days, cached=False).pushdown
+
+    cache = TenantCache(
+        load_query, [*HISTORY_QUERIES, *QUERIES], should_warm=should_warm
+    )
+    cache.start_warming(preload=user_ids)
+    return cache
+
+
+@st.cache_resource(show_spinner=False)
+def get_view_cache() -> TenantCache:
+    """Pushed down query results, per customer, range and grain."""
+    return TenantCache(load_view, [])
+
+
 def create_filter_row(min_date: datetime, max_date: datetime):
     col1, col2 = st.columns(2)
     st.slider(
@@ -125,8 +195,7 @@ def create_metrics_row(df: pd.DataFrame):
             "delta": 7,
         },
     }
-    filtered_df = filter_df_by_date_range(df)
-    result = filtered_df[metrics].sum()
+    result = df[metrics].sum()
     result["total_expense"] = result["total_revenue"] - result["total_profit"]
     for col, metric in metrics_and_cols.items():
         num = int(result.loc[metric["name"]])
@@ -155,15 +224,26 @@ def create_time_series_row(df: pd.DataFrame):
     )
     grain = st.session_state.ts_grain[0]
     agg = st.session_state.ts_aggregation.lower()
-    df = filter_df_by_date_range(df)
-    df["metric_time__day"] = pd.to_datetime(df["metric_time__day"])
-    df["total_revenue"] = df["total_revenue"].astype(float)
-    df = (
-        df.groupby(pd.Grouper(key="metric_time__day", freq=grain))
-        .agg({"total_revenue": agg})
-        .reset_index()
+    pushed_down = DAY not in df.columns
+    if pushed_down:
+        # Already at the selected grain
+        time_col = next(c for c in df.columns if c.startswith("metric_time__"))
+        df = df.rename(columns={time_col: DAY})
+    df = df.assign(
+        **{
+            DAY: pd.to_datetime(df[DAY]),
+            "total_revenue": df["total_revenue"].astype(float),
+        }
     )
-    col2.bar_chart(df, x="metric_time__day", y="total_revenue")
+    if pushed_down:
+        df = df[[DAY, "total_revenue"]].sort_values(DAY)
+    else:
+        df = (
+            df.groupby(pd.Grouper(key=DAY, freq=grain))
+            .agg({"total_revenue": agg})
+            .reset_index()
+        )
+    col2.bar_chart(df, x=DAY, y="total_revenue")
 
 
 def create_top_n_row(df: pd.DataFrame, n: int = 5) -> None:
@@ -177,7 +257,6 @@ def create_top_n_row(df: pd.DataFrame, n: int = 5) -> None:
         )
 
     col1, col2 = st.columns(2)
-    df = filter_df_by_date_range(df)
     clerk_df = group_df("customer_order__clerk_on_order", n)
     clerk_df.columns = ["Clerk", "Total"]
     col1.subheader(f"Top {n} Clerks")
@@ -189,24 +268,80 @@ def create_top_n_row(df: pd.DataFrame, n: int = 5) -> None:
     col2.dataframe(region_df, use_container_width=True, hide_index=True)
 
 
+def plan_caption(plan: Plan) -> str:
+    how = "date range pushed down" if plan.pushdown else "sliced from history"
+    return f"Data {how} ({plan.reason})"
+
+
 def build_app(user_id: int):
-    initial_data_df = retrieve_data(user_id, **QUERIES["totals"])
-    expense_data_df = retrieve_data(user_id, **QUERIES["expenses"])
-    min_date = initial_data_df["metric_time__day"].min()
-    max_date = initial_data_df["metric_time__day"].max()
+    planner = get_planner()
+    view_cache = get_view_cache()
+    mode = st.sidebar.selectbox(
+        "Data Loading",
+        options=PLAN_MODES,
+        key="plan_mode",
+        help=(
+            "Auto slices a customer's cached or small history locally and "
+            "pushes the date range and grain down to the Semantic Layer otherwise"
+        ),
+    )
+    full = {name: dashboard_cache.peek(user_id, name) for name in QUERIES}
+
+    with st.spinner("Loading dashboard..."):
+        if full["totals"] is not None:
+            profile_df = full["totals"]
+            min_date, max_date = profile_df[DAY].min(), profile_df[DAY].max()
+        else:
+            bounds = [dashboard_cache.get(user_id, n) for n in HISTORY_QUERIES]
+            profile_df, last_df = (future.result() for future in bounds)
+            min_date, max_date = profile_df.loc[0, DAY], last_df.loc[0, DAY]
+
+    # Plan and start every query before waiting on any, so the dashboard takes
+    # as long as the slowest one; each section renders once its own data is in
+    days = history_days(min_date, max_date)
+    start, end = clamp_range(st.session_state.get("date_range"), min_date, max_date)
+    grain = st.session_state.get("ts_grain", "Day").lower()
+    if st.session_state.get("ts_aggregation", "Sum") != "Sum":
+        # Mean, min and max per period need the daily rows
+        grain = "day"
+    grains = {"totals": grain, "expenses": None}
+    plans: Dict[str, Plan] = {}
+    futures: Dict[str, Future] = {}
+    for name in QUERIES:
+        plans[name] = planner.plan(name, days, full[name] is not None, mode)
+        if plans[name].pushdown:
+            view = View(name, to_date(start), to_date(end), grains[name])
+            futures[name] = view_cache.get(user_id, view)
+        else:
+            futures[name] = dashboard_cache.get(user_id, name)
+
+    def view_data(name: str) -> pd.DataFrame:
+        df = futures[name].result()
+        if plans[name].pushdown:
+            return df
+
+        planner.observe(name, len(df), days)
+        return filter_df_by_date_range(df)
+
     st.header("View the Customer's Dashboard")
     st.divider()
     st.subheader(f"Customer: {st.session_state['name']}")
-    create_info_row(initial_data_df)
+    create_info_row(profile_df)
     st.divider()
     create_filter_row(min_date, max_date)
     with st.container(border=True):
         st.subheader("Financial Metrics")
-        create_metrics_row(initial_data_df)
-        create_time_series_row(initial_data_df)
+        with st.spinner("Loading metrics..."):
+            totals_df = view_data("totals")
+        create_metrics_row(totals_df)
+        create_time_series_row(totals_df)
+        st.caption(plan_caption(plans["totals"]))
         st.subheader("Touchpoints")
         st.number_input(label="Top N", min_value=1, max_value=10, value=5, key="top_n")
+        with st.spinner("Loading touchpoints..."):
+            expense_data_df = view_data("expenses")
         create_top_n_row(expense_data_df, st.session_state.top_n)
+        st.caption(plan_caption(plans["expenses"]))
 
 
 with open("./config.yaml") as file:
@@ -214,6 +349,10 @@ with open("./config.yaml") as file:
 
 user_dict = {k: v["password"] for k, v in config["credentials"]["usernames"].items()}
 
+dashboard_cache = get_dashboard_cache(
+    tuple(v["user_id"] for v in config["credentials"]["usernames"].values())
+)
+
 st.title("Embedded Analytics")
 
 st.write(
@@ -414,6 +553,7 @@ if st.session_state["authentication_status"]:
     except KeyError:
         pass
     else:
+        dashboard_cache.record_activity(user_id)
         build_app(user_id)
         st.write("Logout and try another user!")
     authenticator.logout()
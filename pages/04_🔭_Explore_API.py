@@ -1,6 +1,10 @@
 # third party
 import streamlit as st
 
+# first party
+from bootstrap import sync_bootstrap
+from catalog import sync_catalog
+
 st.set_page_config(
     page_title="Explore API",
     page_icon="🔭",
@@ -11,6 +15,9 @@ if "conn" not in st.session_state or st.session_state.conn is None:
     st.warning("Go to home page and enter your JDBC URL")
     st.stop()
 
+sync_catalog()
+sync_bootstrap()
+
 if "metric_dict" not in st.session_state:
     st.warning(
         "No metrics found.  Ensure your project has metrics defined and a production "
@@ -26,10 +33,13 @@ from typing import Dict
 import pandas as pd
 
 # first party
+from catalog_index import get_catalog_index
 from client import submit_request
-from helpers import get_shared_elements, to_arrow_table
+from helpers import run_query
 from queries import GRAPHQL_QUERIES, JDBC_QUERIES
 
+catalog_index = get_catalog_index()
+
 
 def _tabbed_queries(key: str, *, format: Dict = None, variables: Dict = None):
     tab1, tab2 = st.tabs(["GraphQL", "JDBC"])
@@ -101,7 +111,7 @@ with tab2:
     st.info("Use this query to fetch all dimensions for a metric.")
     metrics = st.multiselect(
         label="Select Metric(s)",
-        options=sorted(st.session_state.metric_dict.keys()),
+        options=catalog_index.metrics,
         default=None,
         placeholder="Select a Metric",
         key="explore_metric_2",
@@ -129,18 +139,14 @@ with tab3:
     )
     metrics = st.multiselect(
         label="Select Metric(s)",
-        options=sorted(st.session_state.metric_dict.keys()),
+        options=catalog_index.metrics,
         default=None,
         placeholder="Select a Metric",
         key="explore_metric_3",
     )
-    all_dimensions = [
-        v["dimensions"] for k, v in st.session_state.metric_dict.items() if k in metrics
-    ]
-    unique_dimensions = get_shared_elements(all_dimensions)
     dimension = st.selectbox(
         label="Select Dimension",
-        options=sorted(unique_dimensions),
+        options=catalog_index.compatible_dimensions(metrics),
         placeholder="Select a dimension",
     )
     metrics = [{"name": metric} for metric in metrics]
@@ -164,27 +170,13 @@ with tab3:
                     "groupBy": dimensions,
                 },
             }
-            json = submit_request(st.session_state.conn, payload)
-            try:
-                query_id = json["data"]["createDimensionValuesQuery"]["queryId"]
-            except KeyError:
-                st.error(json["errors"][0]["message"])
-                st.stop()
-            while True:
-                query = GRAPHQL_QUERIES["get_results"]
-                payload = {"query": query, "variables": {"queryId": query_id}}
-                json = submit_request(st.session_state.conn, payload)
-                try:
-                    data = json["data"]["query"]
-                except TypeError:
-                    st.error(json["errors"][0]["message"])
-                    st.stop()
-                else:
-                    if data["status"].lower() == "successful":
-                        break
-
-            df = to_arrow_table(data["arrowResult"])
-            st.dataframe(df, use_container_width=True)
+            table, _ = run_query(
+                payload,
+                key="createDimensionValuesQuery",
+                progress=False,
+                to_pandas=False,
+            )
+            st.dataframe(table, use_container_width=True)
 
 with tab4:
     st.info(
@@ -192,7 +184,7 @@ with tab4:
     )
     metrics = st.multiselect(
         label="Select Metric(s)",
-        options=sorted(st.session_state.metric_dict.keys()),
+        options=catalog_index.metrics,
         default=None,
         placeholder="Select a Metric",
         key="explore_metric_4",
@@ -213,11 +205,9 @@ with tab5:
     st.info(
         "Use this query to fetch available metrics given dimensions. This command is essentially the opposite of getting dimensions given a list of metrics."
     )
-    all_dimensions = [v["dimensions"] for k, v in st.session_state.metric_dict.items()]
-    unique_dimensions = get_shared_elements(all_dimensions)
     dimensions = st.multiselect(
         label="Select Dimension(s)",
-        options=sorted(unique_dimensions),
+        options=catalog_index.common_dimensions(),
         default=None,
         placeholder="Select a dimension",
     )
@@ -0,0 +1,233 @@
+# stdlib
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Set, Tuple
+
+# third party
+import streamlit as st
+
+# first party
+from client import (
+    DEFAULT_POLLING,
+    ConnAttr,
+    PollingStrategy,
+    SemanticLayerError,
+    _transport_key,
+    submit_request,
+)
+from queries import GRAPHQL_QUERIES
+
+STATUS_FIELDS = ["queryId", "status", "error"]
+RESULT_FIELDS = ["arrowResult", "error", "queryId", "sql", "status"]
+
+
+class PendingQuery:
+    """Handle for a queryId registered with the `StatusPoller`."""
+
+    def __init__(self, conn: ConnAttr, query_id: str, polling: PollingStrategy):
+        self.conn = conn
+        self.query_id = query_id
+        self.status = "pending"
+        self.future: Future = Future()
+        self._intervals = polling.intervals()
+        self.next_poll_at = time.monotonic() + next(self._intervals)
+
+    def reschedule(self):
+        self.next_poll_at = time.monotonic() + next(self._intervals)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def wait(self, timeout: float = None) -> bool:
+        try:
+            self.future.exception(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def result(self, timeout: float = None) -> Dict:
+        return self.future.result(timeout)
+
+
+def _environment_key(conn: ConnAttr) -> Tuple[str, str, str]:
+    return (*_transport_key(conn), str(conn.params["environmentid"]))
+
+
+def build_batch_query(query_ids: List[str], fields: List[str]) -> Dict:
+    """Build one GraphQL document polling every queryId through an alias."""
+    aliases = {f"q{i}": query_id for i, query_id in enumerate(query_ids)}
+    selections = "".join(
+        GRAPHQL_QUERIES["get_results_batch_selection"].format(
+            alias=alias, fields="\n    ".join(fields)
+        )
+        for alias in aliases
+    )
+    query = GRAPHQL_QUERIES["get_results_batch"].format(
+        arguments=", ".join(f"${alias}: String!" for alias in aliases),
+        selections=selections,
+    )
+    return {"query": query, "variables": aliases}
+
+
+def _alias_errors(json: Dict) -> Dict[str, str]:
+    errors = {}
+    for error in json.get("errors") or []:
+        path = error.get("path") or [None]
+        errors.setdefault(path[0], error.get("message"))
+    return errors
+
+
+class StatusPoller:
+    """Process-wide poller multiplexing outstanding queryIds per environment.
+
+    Each registered query keeps its own backoff schedule; on every tick the
+    queries that are due are grouped by environment and polled with a single
+    aliased GraphQL document.  `arrowResult` is only requested, in a second
+    document, for the queries that reported `successful`.  Environments are
+    polled independently, so a slow one does not hold up the others.
+    """
+
+    def __init__(
+        self,
+        polling: PollingStrategy = DEFAULT_POLLING,
+        max_batch: int = 50,
+        coalesce_window: float = 0.05,
+        max_workers: int = 4,
+    ):
+        self.polling = polling
+        self.max_batch = max_batch
+        self.coalesce_window = coalesce_window
+        self._pending: Dict[Tuple, List[PendingQuery]] = defaultdict(list)
+        # Environments with a poll in flight, skipped until it completes
+        self._polling: Set[Tuple] = set()
+        self._lock = threading.Condition()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="sl-poller"
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="sl-status-poller", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, conn: ConnAttr, query_id: str) -> PendingQuery:
+        pending = PendingQuery(conn, query_id, self.polling)
+        with self._lock:
+            self._pending[_environment_key(conn)].append(pending)
+            self._lock.notify()
+        return pending
+
+    @property
+    def outstanding(self) -> int:
+        with self._lock:
+            return sum(len(queries) for queries in self._pending.values())
+
+    def _run(self):
+        while True:
+            with self._lock:
+                due = self._take_due()
+                if not due:
+                    self._lock.wait(self._next_wakeup())
+                    continue
+
+                self._polling.update(due)
+            for key, queries in due.items():
+                future = self._executor.submit(self._poll_environment, queries)
+                future.add_done_callback(lambda f, key=key: self._polled(key))
+
+    def _polled(self, key: Tuple):
+        with self._lock:
+            self._polling.discard(key)
+            self._lock.notify()
+
+    def _next_wakeup(self) -> float:
+        next_polls = [
+            q.next_poll_at
+            for key, queries in self._pending.items()
+            if key not in self._polling
+            for q in queries
+        ]
+        if not next_polls:
+            return None
+
+        return max(0, min(next_polls) - time.monotonic())
+
+    def _take_due(self) -> Dict[Tuple, List[PendingQuery]]:
+        cutoff = time.monotonic() + self.coalesce_window
+        due = {}
+        for key, queries in self._pending.items():
+            if key in self._polling:
+                continue
+
+            ready = [q for q in queries if q.next_poll_at <= cutoff]
+            if ready:
+                due[key] = ready
+        return due
+
+    def _poll_environment(self, queries: List[PendingQuery]):
+        for i in range(0, len(queries), self.max_batch):
+            batch = queries[i : i + self.max_batch]
+            try:
+                self._poll_batch(batch)
+            except Exception as e:
+                for pending in batch:
+                    self._finish(pending, exception=SemanticLayerError(str(e)))
+
+    def _poll_batch(self, batch: List[PendingQuery]):
+        conn = batch[0].conn
+        json = submit_request(
+            conn, build_batch_query([q.query_id for q in batch], STATUS_FIELDS)
+        )
+        data = json.get("data") or {}
+        errors = _alias_errors(json)
+        successful = []
+        for i, pending in enumerate(batch):
+            alias = f"q{i}"
+            result = data.get(alias)
+            if result is None:
+                message = errors.get(alias) or errors.get(None) or "Query not found"
+                self._finish(pending, exception=SemanticLayerError(message))
+                continue
+
+            pending.status = result["status"].lower()
+            if pending.status == "successful":
+                successful.append(pending)
+            elif pending.status == "failed":
+                self._finish(pending, exception=SemanticLayerError(result["error"]))
+            else:
+                with self._lock:
+                    pending.reschedule()
+
+        if successful:
+            json = submit_request(
+                conn,
+                build_batch_query([q.query_id for q in successful], RESULT_FIELDS),
+            )
+            data = json.get("data") or {}
+            errors = _alias_errors(json)
+            for i, pending in enumerate(successful):
+                alias = f"q{i}"
+                if data.get(alias) is None:
+                    message = errors.get(alias) or errors.get(None) or "Query not found"
+                    self._finish(pending, exception=SemanticLayerError(message))
+                else:
+                    self._finish(pending, result=data[alias])
+
+    def _finish(self, pending: PendingQuery, result: Dict = None, exception=None):
+        with self._lock:
+            queries = self._pending[_environment_key(pending.conn)]
+            if pending in queries:
+                queries.remove(pending)
+            if not queries:
+                del self._pending[_environment_key(pending.conn)]
+        if exception is not None:
+            pending.status = "failed"
+            pending.future.set_exception(exception)
+        else:
+            pending.future.set_result(result)
+
+
+@st.cache_resource(show_spinner=False)
+def get_status_poller() -> StatusPoller:
+    return StatusPoller()
@@ -77,6 +77,20 @@ mutation GetDimensionValues($environmentId: BigInt!, $groupBy: [GroupByInput!]!,
   ) {
     queryId
   }
+}
+    """,
+    "dimension_values_page": """
+mutation GetDimensionValuesPage($environmentId: BigInt!, $groupBy: [GroupByInput!], $where: [WhereInput!], $orderBy: [OrderByInput!], $limit: Int) {
+  createQuery(
+    environmentId: $environmentId
+    metrics: []
+    groupBy: $groupBy
+    where: $where
+    orderBy: $orderBy
+    limit: $limit
+  ) {
+    queryId
+  }
 }
     """,
     "metric_for_dimensions": """
@@ -109,6 +123,14 @@ query GetResults($environmentId: BigInt!, $queryId: String!) {
   }
 }
     """,
+    "get_results_batch": """
+query GetResultsBatch($environmentId: BigInt!, {arguments}) {{{selections}
+}}
+    """,
+    "get_results_batch_selection": """
+  {alias}: query(environmentId: $environmentId, queryId: ${alias}) {{
+    {fields}
+  }}""",
     "queryable_granularities": """
 query GetQueryableGranularities($environmentId: BigInt!, $metrics:[MetricInput!]!) {
   queryableGranularities(environmentId: $environmentId, metrics: $metrics)
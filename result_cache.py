@@ -0,0 +1,175 @@
+# stdlib
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# third party
+import pyarrow as pa
+import streamlit as st
+
+# first party
+from client import ConnAttr
+from schema import Query
+
+CACHE_DIR = os.environ.get("DBT_SL_CACHE_DIR", ".sl_cache")
+RESULT_CACHE_TTL = int(os.environ.get("DBT_SL_RESULT_CACHE_TTL", 60 * 60 * 24))
+RESULT_CACHE_MAX_BYTES = int(
+    os.environ.get("DBT_SL_RESULT_CACHE_MAX_BYTES", 1024 * 1024 * 1024)
+)
+
+# Keys stored in the Arrow schema metadata of each cached file
+_METADATA_PREFIX = b"dbt_sl."
+
+
+def environment_key(conn: ConnAttr) -> str:
+    """Stable identifier for a Semantic Layer environment (host + environment id)."""
+    return f"{conn.host}|{conn.params['environmentid']}"
+
+
+def payload_key(conn: ConnAttr, payload: Dict) -> str:
+    variables = {
+        k: v
+        for k, v in (payload.get("variables") or {}).items()
+        if k != "environmentId"
+    }
+    canonical = json.dumps(
+        {
+            "environment": environment_key(conn),
+            "query": " ".join(payload["query"].split()),
+            "variables": variables,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def query_key(conn: ConnAttr, query: Query) -> str:
+    # Flight entries store the request text rather than compiled SQL
+    canonical = f"{environment_key(conn)}|{conn.result_transport}|{query.fingerprint}"
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Disk-backed cache of query results stored as compressed Arrow IPC files.
+
+    Entries expire after `ttl` seconds and the least recently used entries are
+    evicted once the files on disk exceed `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        directory: str = os.path.join(CACHE_DIR, "results"),
+        ttl: int = RESULT_CACHE_TTL,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        compression: str = "zstd",
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # key -> (size in bytes, last access)
+        self._entries: Dict[str, Tuple[int, float]] = {}
+        for name in os.listdir(directory):
+            if name.endswith(".arrow"):
+                stat = os.stat(os.path.join(directory, name))
+                self._entries[name[: -len(".arrow")]] = (stat.st_size, stat.st_mtime)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.arrow")
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(size for size, _ in self._entries.values())
+
+    def get(self, key: str) -> Optional[Tuple[pa.Table, Dict[str, str]]]:
+        """Return the cached table and its metadata, or None if missing/expired.
+
+        Entries removed by a concurrent `put`, `delete` or eviction are misses.
+        """
+        if key not in self._entries:
+            return None
+
+        path = self._path(key)
+        try:
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            self.delete(key)
+            return None
+
+        metadata = {
+            k[len(_METADATA_PREFIX) :].decode(): v.decode()
+            for k, v in (table.schema.metadata or {}).items()
+            if k.startswith(_METADATA_PREFIX)
+        }
+        if time.time() - float(metadata.get("created_at", 0)) > self.ttl:
+            self.delete(key)
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                # Evicted or deleted by another thread while being read
+                return None
+
+            self._entries[key] = (entry[0], now)
+        try:
+            os.utime(path, (now, now))
+        except FileNotFoundError:
+            self.delete(key)
+            return None
+
+        return table.replace_schema_metadata(None), metadata
+
+    def put(self, key: str, table: pa.Table, metadata: Dict[str, str] = None):
+        metadata = {"created_at": str(time.time()), **(metadata or {})}
+        schema_metadata = {
+            _METADATA_PREFIX + k.encode(): str(v).encode() for k, v in metadata.items()
+        }
+        table = table.replace_schema_metadata(schema_metadata)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._entries[key] = (os.path.getsize(path), time.time())
+        self.evict()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        with self._lock:
+            by_last_access = sorted(self._entries.items(), key=lambda e: e[1][1])
+        total = sum(size for _, (size, _) in by_last_access)
+        for key, (size, _) in by_last_access:
+            if total <= self.max_bytes:
+                break
+            self.delete(key)
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._entries)
+        for key in keys:
+            self.delete(key)
+
+
+@st.cache_resource(show_spinner=False)
+def get_result_cache() -> ResultCache:
+    return ResultCache()
@@ -1,6 +1,8 @@
 # stdlib
+import hashlib
+import re
 from enum import Enum
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Literal, Optional, Union
 
 # third party
 import streamlit as st
@@ -30,6 +32,18 @@ GQL_MAP: Dict = {
 }
 
 
+# Single-quoted SQL literals, including escaped quotes ('')
+_SQL_LITERAL = re.compile(r"('(?:[^']|'')*')")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace in a where clause, leaving string literals untouched."""
+    parts = _SQL_LITERAL.split(sql)
+    return "".join(
+        part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts)
+    ).strip()
+
+
 class TimeGranularity(str, Enum):
     hour = "HOUR"
     day = "DAY"
@@ -102,6 +116,42 @@ class Query(BaseModel):
     orderBy: Optional[List[OrderByInput]] = None
     limit: Optional[int] = None
 
+    def canonical(self) -> "Query":
+        """Normalized copy of the query.
+
+        Metrics, group bys and where clauses are deduplicated and sorted, and
+        whitespace in where clauses is collapsed.  Order bys keep their order
+        (it's significant) but duplicates are dropped.
+        """
+        metrics = sorted({m.name for m in self.metrics})
+        group_by = {(g.name, g.grain) for g in self.groupBy or []}
+        where = {normalize_sql(w.sql) for w in self.where or []}
+        order_by = []
+        for o in self.orderBy or []:
+            if o not in order_by:
+                order_by.append(o)
+        return Query(
+            metrics=[MetricInput(name=name) for name in metrics],
+            groupBy=[
+                GroupByInput(name=name, grain=grain)
+                for name, grain in sorted(group_by, key=lambda g: (g[0], g[1] or ""))
+            ]
+            or None,
+            where=[WhereInput(sql=sql) for sql in sorted(where)] or None,
+            orderBy=order_by or None,
+            limit=self.limit or None,
+        )
+
+    @property
+    def fingerprint(self) -> str:
+        """Stable hash of the canonical query, shared by every caching layer."""
+        canonical = self.canonical().model_dump_json(exclude_none=True)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        return {"query": self.gql, "variables": self.variables}
+
     @property
     def all_names(self):
         return self.metric_names + self.dimension_names
@@ -250,6 +300,21 @@ from {{{{
         return variables
 
 
+class QuestionIntent(BaseModel):
+    question: str = Field(
+        description=(
+            "The follow up question rephrased as a standalone question, or the "
+            "follow up question unchanged if it is unrelated to the chat history."
+        )
+    )
+    intent: Literal["query", "metadata"] = Field(
+        description=(
+            "Whether the standalone question asks for data (query) or about the "
+            "semantic layer itself (metadata)."
+        )
+    )
+
+
 class QueryLoader:
     def __init__(self, state: st.session_state):
         self.state = state
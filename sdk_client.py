@@ -0,0 +1,136 @@
+# stdlib
+import asyncio
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+# third party
+import pyarrow as pa
+import streamlit as st
+from aiohttp import ClientConnectionError
+from dbtsl.asyncio import AsyncSemanticLayerClient
+from dbtsl.error import AuthError, ConnectTimeoutError
+from gql.transport.exceptions import TransportClosed, TransportServerError
+
+# first party
+from async_client import get_event_loop
+from client import ConnAttr, _transport_key
+
+# Errors that mean the session (not the query) is broken; anything else, such
+# as an unknown metric or a bad where clause, is raised as is
+SESSION_ERRORS = (
+    AuthError,
+    ConnectTimeoutError,
+    ClientConnectionError,
+    TransportClosed,
+)
+
+
+def _session_broken(error: Exception) -> bool:
+    if isinstance(error, TransportServerError):
+        # A rejected token; other statuses are failures of the query itself
+        return error.code in (401, 403)
+
+    return isinstance(error, SESSION_ERRORS)
+
+
+class _Session:
+    """A `dbtsl` client with an open session and the queries using it."""
+
+    def __init__(self, client: AsyncSemanticLayerClient, context: Any):
+        self.client = client
+        self.context = context
+        self.users = 0
+        self.retired = False
+
+
+class SDKClient:
+    """Process-wide `dbtsl` async client with one long-lived session.
+
+    Queries run on the shared event loop, so several of them can be in flight
+    at once over the same session instead of each opening its own.  When the
+    session breaks, new queries get a fresh one and the old one is closed
+    once the queries still using it are done.
+    """
+
+    def __init__(self, conn: ConnAttr):
+        self.conn = conn
+        self._runner = get_event_loop()
+        self._session: Optional[_Session] = None
+        self._session_lock = self._runner.run(self._create_lock())
+
+    def _create(self) -> AsyncSemanticLayerClient:
+        return AsyncSemanticLayerClient(
+            environment_id=self.conn.params["environmentid"],
+            auth_token=self.conn.auth_header.replace("Bearer ", ""),
+            host=self.conn.host.replace("https://", ""),
+        )
+
+    @staticmethod
+    async def _create_lock() -> asyncio.Lock:
+        return asyncio.Lock()
+
+    async def _acquire(self) -> _Session:
+        async with self._session_lock:
+            if self._session is None:
+                # A dbtsl client holds one session at a time, so each session
+                # gets its own client
+                client = self._create()
+                context = client.session()
+                await context.__aenter__()
+                self._session = _Session(client, context)
+            self._session.users += 1
+            return self._session
+
+    async def _release(self, session: _Session):
+        async with self._session_lock:
+            session.users -= 1
+            close = session.retired and session.users == 0
+        if close:
+            try:
+                await session.context.__aexit__(None, None, None)
+            except Exception as e:
+                print(f"Error closing Semantic Layer SDK session; {e}")
+
+    async def _retire(self, session: _Session):
+        async with self._session_lock:
+            if self._session is session:
+                self._session = None
+            session.retired = True
+
+    async def query(self, **kwargs) -> pa.Table:
+        session = await self._acquire()
+        try:
+            return await session.client.query(**kwargs)
+        except Exception as e:
+            if not _session_broken(e):
+                raise
+
+            # The session may have expired; retry once with a fresh one
+            await self._retire(session)
+        finally:
+            await self._release(session)
+
+        session = await self._acquire()
+        try:
+            return await session.client.query(**kwargs)
+        finally:
+            await self._release(session)
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine on the shared loop without waiting on it."""
+        return self._runner.submit(coro)
+
+    def run(self, coro: Coroutine) -> Any:
+        return self._runner.run(coro)
+
+
+@st.cache_resource(show_spinner=False)
+def _get_sdk_client(
+    host: str, token_hash: str, environment_id: str, _conn: ConnAttr
+) -> SDKClient:
+    return SDKClient(_conn)
+
+
+def get_sdk_client(conn: ConnAttr) -> SDKClient:
+    """Return the process-wide SDK client for a connection."""
+    return _get_sdk_client(*_transport_key(conn), conn.params["environmentid"], conn)
@@ -0,0 +1,208 @@
+# stdlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+# third party
+import pandas as pd
+
+TENANT_CACHE_TTL = int(os.environ.get("DBT_SL_TENANT_CACHE_TTL", 60 * 15))
+TENANT_CACHE_MAX_BYTES = int(
+    os.environ.get("DBT_SL_TENANT_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+)
+# Tenants seen within this window are kept warm
+TENANT_ACTIVE_WINDOW = int(os.environ.get("DBT_SL_TENANT_ACTIVE_WINDOW", 60 * 60))
+TENANT_WARM_INTERVAL = int(os.environ.get("DBT_SL_TENANT_WARM_INTERVAL", 60))
+
+
+def dataframe_size(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+@dataclass
+class _Entry:
+    future: Future
+    loaded_at: float = field(default_factory=time.monotonic)
+    nbytes: int = 0
+
+
+class TenantCache:
+    """Query results per tenant with a memory budget, TTL and LRU eviction.
+
+    `loader(tenant, name)` starts loading one named result and returns a
+    future.  A background scheduler keeps `names` warm for recently active
+    tenants (filtered by `should_warm(tenant, name)` if given): results are
+    loaded ahead of a login and refreshed before they expire, and a refresh
+    only replaces the cached result once it succeeds.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Hashable, Hashable], Future],
+        names: List[Hashable],
+        *,
+        should_warm: Callable[[Hashable, Hashable], bool] = None,
+        ttl: int = TENANT_CACHE_TTL,
+        max_bytes: int = TENANT_CACHE_MAX_BYTES,
+        active_window: int = TENANT_ACTIVE_WINDOW,
+        warm_interval: int = TENANT_WARM_INTERVAL,
+        size_of: Callable[[Any], int] = dataframe_size,
+    ):
+        self.loader = loader
+        self.names = names
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.active_window = active_window
+        self.warm_interval = warm_interval
+        self.size_of = size_of
+        self.should_warm = should_warm
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[Hashable, Hashable], _Entry]" = OrderedDict()
+        self._refreshing: Dict[Tuple[Hashable, Hashable], Future] = {}
+        self._last_active: Dict[Hashable, float] = {}
+        self.nbytes = 0
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "refreshes": 0}
+        self._scheduler = None
+
+    def _fresh(self, entry: _Entry, now: float) -> bool:
+        if not entry.future.done():
+            return True
+
+        return entry.future.exception() is None and now - entry.loaded_at < self.ttl
+
+    def get(self, tenant: Hashable, name: Hashable) -> Future:
+        """Future for a result, loading it only if nothing fresh is cached."""
+        key = (tenant, name)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(entry, now):
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return entry.future
+
+            self.counters["misses"] += 1
+            if entry is not None:
+                self._remove(key)
+            entry = self._entries[key] = _Entry(self.loader(tenant, name))
+        entry.future.add_done_callback(lambda f: self._loaded(key, entry))
+        return entry.future
+
+    def peek(self, tenant: Hashable, name: Hashable) -> Optional[Any]:
+        """A fresh loaded result, without loading it or counting a hit."""
+        with self._lock:
+            entry = self._entries.get((tenant, name))
+            if (
+                entry is None
+                or not entry.future.done()
+                or not self._fresh(entry, time.monotonic())
+            ):
+                return None
+
+            return entry.future.result()
+
+    def _loaded(self, key: Tuple[Hashable, Hashable], entry: _Entry):
+        with self._lock:
+            if self._entries.get(key) is not entry:
+                return
+
+            if entry.future.exception() is not None:
+                # Retry on the next request instead of serving the error
+                self._remove(key)
+                return
+
+            entry.loaded_at = time.monotonic()
+            entry.nbytes = self.size_of(entry.future.result())
+            self.nbytes += entry.nbytes
+            self._evict()
+
+    def _remove(self, key: Tuple[Hashable, Hashable]):
+        entry = self._entries.pop(key)
+        self.nbytes -= entry.nbytes
+
+    def _evict(self):
+        # Least recently used first; the newest entry is kept even if it alone
+        # is over budget
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.counters["evictions"] += 1
+
+    def refresh(self, tenant: Hashable, name: Hashable):
+        """Reload a result in the background, serving the old one until then."""
+        key = (tenant, name)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            future = self._refreshing[key] = self.loader(tenant, name)
+            self.counters["refreshes"] += 1
+        future.add_done_callback(lambda f: self._refreshed(key, f))
+
+    def _refreshed(self, key: Tuple[Hashable, Hashable], future: Future):
+        with self._lock:
+            del self._refreshing[key]
+            if future.exception() is not None:
+                print(f"Error refreshing {key}; {future.exception()}")
+                return
+
+            if key in self._entries:
+                self._remove(key)
+            entry = self._entries[key] = _Entry(future)
+            entry.nbytes = self.size_of(future.result())
+            self.nbytes += entry.nbytes
+            self._evict()
+
+    def record_activity(self, tenant: Hashable):
+        """Note a login or view so the tenant is kept warm."""
+        with self._lock:
+            self._last_active[tenant] = time.monotonic()
+
+    def active_tenants(self) -> List[Hashable]:
+        cutoff = time.monotonic() - self.active_window
+        with self._lock:
+            return [t for t, seen in self._last_active.items() if seen >= cutoff]
+
+    def warm(self, tenants: Iterable[Hashable]):
+        """Load missing results and refresh ones close to expiring."""
+        now = time.monotonic()
+        for tenant in tenants:
+            for name in self.names:
+                if self.should_warm is not None and not self.should_warm(tenant, name):
+                    continue
+
+                with self._lock:
+                    entry = self._entries.get((tenant, name))
+                if entry is None:
+                    self.get(tenant, name)
+                elif entry.future.done() and now - entry.loaded_at > self.ttl * 0.8:
+                    self.refresh(tenant, name)
+
+    def start_warming(self, preload: Iterable[Hashable] = ()):
+        """Warm `preload` tenants now, then active tenants every interval."""
+        for tenant in preload:
+            self.record_activity(tenant)
+        if self._scheduler is None:
+            self._scheduler = threading.Thread(
+                target=self._warm_forever, name="sl-tenant-warmer", daemon=True
+            )
+            self._scheduler.start()
+
+    def _warm_forever(self):
+        while True:
+            try:
+                self.warm(self.active_tenants())
+            except Exception as e:
+                print(f"Error warming tenant cache; {e}")
+            time.sleep(self.warm_interval)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "bytes": self.nbytes,
+            }
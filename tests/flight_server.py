@@ -0,0 +1,66 @@
+# third party
+import pyarrow as pa
+import pyarrow.flight as flight
+
+# `CommandGetSqlInfo` results, which the Flight SQL driver reads on connect
+_SQL_INFO_VALUE = pa.dense_union(
+    [
+        pa.field("string_value", pa.string()),
+        pa.field("bool_value", pa.bool_()),
+        pa.field("bigint_value", pa.int64()),
+        pa.field("int32_bitmask", pa.int32()),
+        pa.field("string_list", pa.list_(pa.string())),
+        pa.field("int32_to_int32_list_map", pa.map_(pa.int32(), pa.list_(pa.int32()))),
+    ]
+)
+SQL_INFO = pa.Table.from_arrays(
+    [
+        pa.array([], pa.uint32()),
+        pa.UnionArray.from_dense(
+            pa.array([], pa.int8()),
+            pa.array([], pa.int32()),
+            [pa.array([], f.type) for f in _SQL_INFO_VALUE],
+            [f.name for f in _SQL_INFO_VALUE],
+        ),
+    ],
+    schema=pa.schema(
+        [
+            pa.field("info_name", pa.uint32(), nullable=False),
+            pa.field("value", _SQL_INFO_VALUE, nullable=False),
+        ]
+    ),
+)
+
+
+class FlightSQLServer(flight.FlightServerBase):
+    """Local stand-in for the Semantic Layer's Flight SQL endpoint.
+
+    Every statement returns `table`, unless its text contains "fail".  The
+    statements received are kept in `queries`.
+    """
+
+    def __init__(self, table: pa.Table):
+        super().__init__("grpc://127.0.0.1:0")
+        self.table = table
+        self.queries = []
+
+    @property
+    def uri(self) -> str:
+        return f"grpc://127.0.0.1:{self.port}"
+
+    def get_flight_info(self, context, descriptor):
+        # Commands are protobuf `Any` messages; the type name is enough here
+        if b"CommandGetSqlInfo" in descriptor.command:
+            ticket, schema = b"sql_info", SQL_INFO.schema
+        else:
+            self.queries.append(descriptor.command.decode("utf-8", "replace"))
+            if b"fail" in descriptor.command:
+                raise flight.FlightServerError("Query failed")
+            ticket, schema = b"statement", self.table.schema
+        endpoint = flight.FlightEndpoint(ticket, [])
+        return flight.FlightInfo(schema, descriptor, [endpoint], -1, -1)
+
+    def do_get(self, context, ticket):
+        if ticket.ticket == b"sql_info":
+            return flight.RecordBatchStream(SQL_INFO)
+        return flight.RecordBatchStream(self.table)
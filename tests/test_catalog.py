@@ -0,0 +1,50 @@
+# stdlib
+import json
+
+# third party
+import pytest
+
+# first party
+from catalog import CatalogStore
+from client import ConnAttr
+
+METRICS = [{"name": "revenue", "dimensions": [{"name": "customer__region"}]}]
+
+
+@pytest.fixture
+def conn():
+    return ConnAttr(
+        host="semantic-layer.cloud.getdbt.com",
+        params={"environmentid": 1},
+        auth_header="Bearer token",
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CatalogStore(directory=str(tmp_path))
+
+
+def test_save_and_load(store, conn):
+    content_hash = store.save(conn, METRICS)
+    assert store.load(conn) == (METRICS, content_hash)
+
+
+def test_missing_catalog(store, conn):
+    assert store.load(conn) is None
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        "not json",
+        json.dumps({"metrics": METRICS}),
+        json.dumps({"hash": "abc", "metrics": [{"name": "revenue"}]}),
+        json.dumps({"hash": "abc", "metrics": [{"dimensions": [{}]}]}),
+        json.dumps(["old", "layout"]),
+    ],
+)
+def test_malformed_catalog_is_refetched(store, conn, data):
+    with open(store._path(conn), "w") as f:
+        f.write(data)
+    assert store.load(conn) is None
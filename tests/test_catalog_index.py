@@ -0,0 +1,82 @@
+# first party
+from catalog_index import CatalogIndex
+
+METRIC_DICT = {
+    "revenue": {
+        "dimensions": ["customer__region", "metric_time", "order__status"],
+        "queryableGranularities": ["DAY", "MONTH", "YEAR"],
+        "requiresMetricTime": False,
+    },
+    "orders": {
+        "dimensions": ["customer__region", "metric_time"],
+        "queryableGranularities": ["month", "week"],
+        "requiresMetricTime": True,
+    },
+    "signups": {
+        "dimensions": ["customer__region"],
+        "queryableGranularities": [],
+        "requiresMetricTime": False,
+    },
+}
+DIMENSION_DICT = {
+    "customer__region": {"type": "categorical"},
+    "order__status": {"type": "CATEGORICAL"},
+}
+
+
+def make_index() -> CatalogIndex:
+    return CatalogIndex(METRIC_DICT, DIMENSION_DICT)
+
+
+def test_compatible_dimensions():
+    index = make_index()
+    assert index.compatible_dimensions([]) == []
+    assert index.compatible_dimensions(["revenue"]) == [
+        "customer__region",
+        "metric_time",
+        "order__status",
+    ]
+    assert index.compatible_dimensions(["revenue", "orders"]) == [
+        "customer__region",
+        "metric_time",
+    ]
+    assert index.common_dimensions() == ["customer__region"]
+
+
+def test_compatible_metrics():
+    index = make_index()
+    assert index.compatible_metrics([]) == ["orders", "revenue", "signups"]
+    assert index.compatible_metrics(["metric_time"]) == ["orders", "revenue"]
+    assert index.compatible_metrics(["metric_time", "order__status"]) == ["revenue"]
+
+
+def test_unknown_names_are_compatible_with_nothing():
+    index = make_index()
+    assert index.compatible_dimensions(["revenue", "deleted_metric"]) == []
+    assert index.compatible_metrics(["deleted_dimension"]) == []
+    assert not index.requires_metric_time(["deleted_metric"])
+    assert not index.has_time_dimension(["deleted_dimension"])
+
+
+def test_dimension_types():
+    index = make_index()
+    assert index.dimension_type("customer__region") == "CATEGORICAL"
+    # Dimensions missing from the dimension catalog are time dimensions
+    assert index.dimension_type("metric_time") == "TIME"
+    assert index.has_time_dimension(["customer__region", "metric_time"])
+    assert not index.has_time_dimension(["customer__region", "order__status"])
+
+
+def test_requires_metric_time():
+    index = make_index()
+    assert index.requires_metric_time(["revenue", "orders"])
+    assert not index.requires_metric_time(["revenue", "signups"])
+
+
+def test_shared_grains_are_shortest_first():
+    index = make_index()
+    assert index.grains == ["day", "week", "month", "year"]
+    assert index.shared_grains([]) == []
+    assert index.shared_grains(["revenue"]) == ["day", "month", "year"]
+    assert index.shared_grains(["revenue", "orders"]) == ["month"]
+    assert index.shared_grains(["revenue", "signups"]) == []
@@ -0,0 +1,97 @@
+# stdlib
+from datetime import date
+
+# first party
+from dashboard_planner import (
+    DAY,
+    DashboardPlanner,
+    View,
+    clamp_range,
+    history_days,
+    time_filter,
+)
+
+QUERIES = {
+    "revenue": {
+        "metrics": ["revenue"],
+        "group_by": [DAY, "customer__region"],
+        "where": ["{{ Dimension('customer__id') }} = 1"],
+    },
+    "totals": {"metrics": ["revenue"], "group_by": ["customer__region"]},
+}
+
+
+def test_time_filter():
+    assert time_filter("2024-01-01", date(2024, 1, 31)) == (
+        "{{ TimeDimension('metric_time', 'DAY') }} "
+        "between '2024-01-01' and '2024-01-31'"
+    )
+
+
+def test_view_query_replaces_the_grain():
+    view = View("revenue", date(2024, 1, 1), date(2024, 3, 31), "month")
+    query = view.query(QUERIES)
+    assert query["group_by"] == ["metric_time__month", "customer__region"]
+    assert query["where"] == [
+        "{{ Dimension('customer__id') }} = 1",
+        time_filter(view.start, view.end),
+    ]
+    assert QUERIES["revenue"]["group_by"] == [DAY, "customer__region"]
+
+
+def test_view_query_without_a_grain_drops_time():
+    query = View("revenue", date(2024, 1, 1), date(2024, 1, 2), None).query(QUERIES)
+    assert query["group_by"] == ["customer__region"]
+
+
+def test_view_query_only_adds_a_grain_to_time_series():
+    query = View("totals", date(2024, 1, 1), date(2024, 1, 2), "week").query(QUERIES)
+    assert query["group_by"] == ["customer__region"]
+    assert query["where"] == [time_filter(date(2024, 1, 1), date(2024, 1, 2))]
+
+
+def test_plan_modes():
+    planner = DashboardPlanner(min_rows=100)
+    planner.observe("revenue", rows=1000, days=10)
+    assert planner.plan("revenue", 10, cached=False, mode="Local").pushdown is False
+    assert planner.plan("revenue", 1, cached=True, mode="Pushdown").pushdown is True
+
+
+def test_plan_auto():
+    planner = DashboardPlanner(min_rows=100)
+    # Nothing observed yet, one row per day
+    assert planner.expected_rows("revenue", 50) == 50
+    assert planner.plan("revenue", 50, cached=False).pushdown is False
+    assert planner.plan("revenue", 500, cached=False).pushdown is True
+
+    planner.observe("revenue", rows=1000, days=10)
+    assert planner.expected_rows("revenue", 10) == 1000
+    assert planner.plan("revenue", 10, cached=False).pushdown is True
+    # A cached history is sliced locally whatever its size
+    assert planner.plan("revenue", 10, cached=True).pushdown is False
+
+
+def test_observe_keeps_the_largest_rate():
+    planner = DashboardPlanner()
+    planner.observe("revenue", rows=300, days=10)
+    planner.observe("revenue", rows=100, days=10)
+    planner.observe("revenue", rows=100, days=0)
+    assert planner.expected_rows("revenue", 10) == 300
+
+
+def test_history_days():
+    assert history_days("2024-01-01", "2024-01-01") == 1
+    assert history_days(date(2024, 1, 1), "2024-12-31") == 366
+
+
+def test_clamp_range():
+    start, end = date(2024, 1, 1), date(2024, 12, 31)
+    assert clamp_range(None, start, end) == [start, end]
+    assert clamp_range([date(2023, 6, 1), date(2024, 2, 1)], start, end) == [
+        start,
+        date(2024, 2, 1),
+    ]
+    assert clamp_range([date(2025, 1, 1), date(2025, 2, 1)], start, end) == [
+        start,
+        end,
+    ]
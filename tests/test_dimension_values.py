@@ -0,0 +1,116 @@
+# stdlib
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# third party
+import pytest
+
+# first party
+import dimension_values
+from async_client import _like_escape
+from client import ConnAttr, SemanticLayerError
+from dimension_values import DimensionSearchIndex, DimensionValuesStore
+from result_cache import environment_key
+
+CONN = ConnAttr(
+    host="https://sl.example.com", params={"environmentid": 1}, auth_header=""
+)
+
+
+def test_like_escape():
+    assert _like_escape("a_b") == "a!_b"
+    assert _like_escape("100%") == "100!%"
+    assert _like_escape("hi!") == "hi!!"
+
+
+def test_search_keeps_warehouse_order_and_cursor():
+    index = DimensionSearchIndex()
+    # A case-insensitive collation, unlike Python's str ordering
+    index.add("b", ["b1", "B2", "b3"], exhausted=False)
+    assert index.search("b") == ["b1", "B2", "b3"]
+    assert index.cursor("b") == "b3"
+    index.add("b", ["B4"], exhausted=True)
+    assert index.search("b") == ["b1", "B2", "b3", "B4"]
+    assert index.cursor("b") == "B4"
+
+
+def test_longer_prefix_answered_from_exhausted_parent():
+    index = DimensionSearchIndex()
+    index.add("a", ["ab", "a_b", "axb"], exhausted=True)
+    assert index.fetched("a_")
+    assert index.search("a_") == ["a_b"]
+
+
+def test_unfetched_prefix():
+    index = DimensionSearchIndex()
+    index.add("", ["a", "b"], exhausted=False)
+    assert not index.fetched("c")
+    assert index.search("c") == []
+    assert index.cursor("c") is None
+
+
+class FakeAsyncClient:
+    def __init__(self, release: threading.Event):
+        self.release = release
+        self.calls = 0
+
+    async def dimension_values_page(self, dimension, limit, prefix=None, after=None):
+        self.calls += 1
+        await asyncio.get_running_loop().run_in_executor(None, self.release.wait)
+        raise SemanticLayerError(f"no such dimension {dimension}")
+
+
+class FakeSyncClient:
+    def __init__(self, client):
+        self.client = client
+        self._executor = ThreadPoolExecutor(2)
+
+    def submit(self, coro):
+        return self._executor.submit(asyncio.run, coro)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    release = threading.Event()
+    client = FakeSyncClient(FakeAsyncClient(release))
+    monkeypatch.setattr(dimension_values, "get_sync_client", lambda conn: client)
+    store = DimensionValuesStore(directory=str(tmp_path))
+    store.release = release
+    store.client = client.client
+    return store
+
+
+def test_warm_reuses_warm_up_in_flight(store):
+    first = store.warm(CONN, ["customer__region"])
+    second = store.warm(CONN, ["customer__region"])
+    assert second is first
+    store.release.set()
+    first.result()
+    assert store.client.calls == 1
+
+
+def test_fetch_returns_errors(store):
+    store.release.set()
+    values = store.fetch(CONN, ["customer__region"])
+    assert isinstance(values["customer__region"], SemanticLayerError)
+    assert store.get(CONN, "customer__region") is None
+
+
+def test_usage_is_written_in_batches(tmp_path):
+    store = DimensionValuesStore(directory=str(tmp_path), usage_flush_interval=0.5)
+    path = store._usage_path(environment_key(CONN))
+    for dimension in ["customer__region", "customer__region", "order__status"]:
+        store.record_use(CONN, dimension)
+    flush = store._usage_flushes[environment_key(CONN)]
+    assert not os.path.exists(path)
+    assert store.most_used(CONN, ["order__status", "customer__region"], 1) == [
+        "customer__region"
+    ]
+
+    flush.join(2)
+    with open(path) as f:
+        assert json.load(f) == {"customer__region": 2, "order__status": 1}
+    assert [p for p in os.listdir(tmp_path) if p.endswith(".tmp")] == []
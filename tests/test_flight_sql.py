@@ -0,0 +1,100 @@
+# third party
+import pyarrow as pa
+import pytest
+
+pytest.importorskip("adbc_driver_flightsql")
+
+# first party
+import helpers  # noqa: E402
+from client import ConnAttr  # noqa: E402
+from flight_server import FlightSQLServer  # noqa: E402
+from flight_sql import FlightSQLTransport  # noqa: E402
+from result_cache import ResultCache  # noqa: E402
+from schema import Query  # noqa: E402
+
+# Two batches, so results are streamed rather than sent in one piece
+TABLE = pa.Table.from_batches(
+    [
+        pa.record_batch({"revenue": [1.5], "metric_time__day": ["2024-01-01"]}),
+        pa.record_batch({"revenue": [2.5], "metric_time__day": ["2024-01-02"]}),
+    ]
+)
+
+
+@pytest.fixture
+def server():
+    server = FlightSQLServer(TABLE)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def transport(server):
+    transport = FlightSQLTransport(server.uri, "Bearer token", "1", pool_size=2)
+    yield transport
+    transport.close()
+
+
+def test_run_query_over_flight(server, tmp_path, monkeypatch):
+    cache = ResultCache(directory=str(tmp_path), ttl=60, max_bytes=10_000_000)
+    monkeypatch.setattr(helpers, "get_result_cache", lambda: cache)
+    conn = ConnAttr(
+        host="semantic-layer.cloud.getdbt.com",
+        params={"environmentid": 1},
+        auth_header="Bearer token",
+        flight_uri=server.uri,
+        result_transport="flight",
+    )
+    query = Query.model_validate(
+        {"metrics": [{"name": "revenue"}], "groupBy": [{"name": "metric_time"}]}
+    )
+
+    table, sql = helpers.run_query(
+        query=query, conn=conn, progress=False, to_pandas=False
+    )
+    assert table.equals(TABLE)
+    assert sql == query.jdbc_query
+    assert len(server.queries) == 1
+    assert "semantic_layer.query" in server.queries[0]
+
+    # Served from the result cache the second time
+    table, _ = helpers.run_query(
+        query=query, conn=conn, progress=False, to_pandas=False
+    )
+    assert table.equals(TABLE)
+    assert len(server.queries) == 1
+
+
+class Status:
+    def __init__(self):
+        self.captions = []
+
+    def caption(self, text: str):
+        self.captions.append(text)
+
+    def empty(self):
+        pass
+
+
+def test_stream_reads_batch_by_batch(transport):
+    status = Status()
+    with transport.stream("select 1") as reader:
+        table = helpers.read_batches(reader, status)
+    assert table.equals(TABLE)
+    assert status.captions == ["Received 1 rows", "Received 2 rows"]
+
+
+def test_queries_run_on_separate_connections(transport):
+    with transport.stream("select 1") as first, transport.stream("select 2") as second:
+        assert second.read_all().equals(TABLE)
+        assert first.read_all().equals(TABLE)
+    assert len(transport._idle) == 2
+
+
+def test_failed_query_drops_the_connection(transport):
+    transport.execute("select 1")
+    assert len(transport._idle) == 1
+    with pytest.raises(Exception, match="Query failed"):
+        transport.execute("select fail")
+    assert len(transport._idle) == 0
+    assert transport.execute("select 1").equals(TABLE)
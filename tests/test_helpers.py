@@ -0,0 +1,17 @@
+# third party
+import pyarrow as pa
+
+# first party
+from helpers import order_columns
+
+
+def test_order_columns_follows_query_order_case_insensitively():
+    table = pa.table({"ORDERS": [1], "METRIC_TIME__MONTH": ["2024-01"], "REVENUE": [2]})
+    ordered = order_columns(table, ["revenue", "orders", "metric_time__month"])
+    assert ordered.column_names == ["REVENUE", "ORDERS", "METRIC_TIME__MONTH"]
+
+
+def test_order_columns_keeps_unknown_columns_last():
+    table = pa.table({"extra": [0], "orders": [1], "revenue": [2]})
+    ordered = order_columns(table, ["revenue", "missing", "orders"])
+    assert ordered.column_names == ["revenue", "orders", "extra"]
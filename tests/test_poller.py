@@ -0,0 +1,48 @@
+# stdlib
+import threading
+
+# first party
+import poller
+from client import ConnAttr, PollingStrategy
+from poller import StatusPoller
+
+
+def make_conn(environment_id: int) -> ConnAttr:
+    return ConnAttr(
+        host="semantic-layer.cloud.getdbt.com",
+        params={"environmentid": environment_id},
+        auth_header="Bearer token",
+    )
+
+
+def test_slow_environment_does_not_block_others(monkeypatch):
+    release = threading.Event()
+    polls = {1: 0, 2: 0}
+
+    def submit_request(conn, payload):
+        environment_id = conn.params["environmentid"]
+        if environment_id == 1:
+            release.wait(5)
+        result = {"queryId": "a", "status": "SUCCESSFUL", "error": None}
+        if "arrowResult" in payload["query"]:
+            result["arrowResult"] = "data"
+        else:
+            # The fast environment needs a second poll to finish
+            polls[environment_id] += 1
+            if polls[environment_id] == 1:
+                result["status"] = "RUNNING"
+        return {"data": {"q0": result}}
+
+    monkeypatch.setattr(poller, "submit_request", submit_request)
+    status_poller = StatusPoller(
+        polling=PollingStrategy(first_interval=0, initial_interval=0.01, jitter=0)
+    )
+    slow = status_poller.submit(make_conn(1), "a")
+    fast = status_poller.submit(make_conn(2), "a")
+    try:
+        assert fast.result(timeout=2)["arrowResult"] == "data"
+        assert not slow.done()
+    finally:
+        release.set()
+    assert slow.result(timeout=2)["arrowResult"] == "data"
+    assert status_poller.outstanding == 0
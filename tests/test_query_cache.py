@@ -0,0 +1,65 @@
+# third party
+import pytest
+
+pytest.importorskip("langchain_community")
+
+# first party
+from llm.query_cache import QueryCache, question_literals  # noqa: E402
+from llm.semantic_layer_docs import HashingEmbeddings  # noqa: E402
+from schema import Query  # noqa: E402
+
+SCOPE = "env|catalog"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return QueryCache(directory=str(tmp_path), embeddings=HashingEmbeddings())
+
+
+def make_query(sql: str) -> Query:
+    return Query.model_validate(
+        {"metrics": [{"name": "total_revenue"}], "where": [{"sql": sql}]}
+    )
+
+
+def test_question_literals():
+    assert question_literals("Revenue by month in 2023?") == ("2023",)
+    assert question_literals("Revenue in June 2024") == ("2024", "june")
+    assert question_literals("Revenue for region 'EMEA'") == ("'emea'",)
+    assert question_literals("What's the customer's revenue?") == ()
+
+
+def test_default_threshold_depends_on_backend(cache):
+    assert cache.threshold == 0.97
+
+
+def test_lookup_reuses_rephrased_question(cache):
+    query = make_query("year = 2023")
+    cache.add(SCOPE, "What is total revenue by month in 2023?", query)
+    hit = cache.lookup(SCOPE, "what is total revenue by month in 2023")
+    assert hit is not None
+    assert hit[0] == query
+
+
+@pytest.mark.parametrize(
+    "cached, asked",
+    [
+        (
+            "What is total revenue by month in 2023?",
+            "What is total revenue by month in 2024?",
+        ),
+        (
+            "What was total revenue in June 2024?",
+            "What was total revenue in July 2024?",
+        ),
+    ],
+)
+def test_lookup_misses_on_different_literals(cache, cached, asked):
+    cache.add(SCOPE, cached, make_query("x"))
+    assert cache.lookup(SCOPE, asked) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_lookup_is_scoped(cache):
+    cache.add(SCOPE, "What is total revenue?", make_query("x"))
+    assert cache.lookup("other|catalog", "What is total revenue?") is None
@@ -0,0 +1,44 @@
+# stdlib
+import threading
+
+# third party
+import pytest
+
+pytest.importorskip("langchain")
+
+# first party
+from llm import registry  # noqa: E402
+from llm.registry import ResourceRegistry  # noqa: E402
+
+
+def test_build_does_not_block_other_lookups(monkeypatch):
+    building = threading.Event()
+    release = threading.Event()
+
+    def build_resources(provider, model, api_key):
+        if model == "slow":
+            building.set()
+            release.wait(5)
+        return (provider, model)
+
+    monkeypatch.setattr(registry, "build_resources", build_resources)
+    resources = ResourceRegistry()
+    slow = threading.Thread(target=resources.get, args=("openai", "slow", "key"))
+    slow.start()
+    try:
+        assert building.wait(2)
+        assert resources.get("openai", "fast", "key") == ("openai", "fast")
+    finally:
+        release.set()
+        slow.join()
+    assert resources.get("openai", "slow", "key") == ("openai", "slow")
+
+
+def test_entries_are_shared_and_bounded(monkeypatch):
+    monkeypatch.setattr(registry, "build_resources", lambda *args: object())
+    resources = ResourceRegistry(max_entries=2)
+    first = resources.get("openai", "a", "key")
+    assert resources.get("openai", "a", "key") is first
+    resources.get("openai", "b", "key")
+    resources.get("openai", "c", "key")
+    assert resources.get("openai", "a", "key") is not first
@@ -0,0 +1,84 @@
+# stdlib
+import os
+import threading
+
+# third party
+import pyarrow as pa
+import pytest
+
+# first party
+from result_cache import ResultCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(directory=str(tmp_path), ttl=60, max_bytes=10_000_000)
+
+
+def make_table() -> pa.Table:
+    return pa.table({"metric_time__day": ["2024-01-01"], "revenue": [1.5]})
+
+
+def test_put_and_get(cache):
+    cache.put("key", make_table(), {"sql": "select 1"})
+    table, metadata = cache.get("key")
+    assert table.equals(make_table())
+    assert metadata["sql"] == "select 1"
+
+
+def test_expired_entry_is_a_miss(cache):
+    cache.put("key", make_table())
+    cache.ttl = -1
+    assert cache.get("key") is None
+    assert "key" not in cache._entries
+
+
+def test_missing_file_is_a_miss(cache):
+    cache.put("key", make_table())
+    os.remove(cache._path("key"))
+    assert cache.get("key") is None
+
+
+def test_entry_evicted_while_reading_is_a_miss(cache, monkeypatch):
+    cache.put("key", make_table())
+    memory_map = pa.memory_map
+
+    def evict_during_read(path):
+        source = memory_map(path)
+        cache.delete("key")
+        return source
+
+    monkeypatch.setattr(pa, "memory_map", evict_during_read)
+    assert cache.get("key") is None
+
+
+def test_eviction_keeps_recently_used(cache):
+    cache.put("old", make_table())
+    cache.put("new", make_table())
+    cache.max_bytes = cache._entries["new"][0]
+    cache.evict()
+    assert cache.get("old") is None
+    assert cache.get("new") is not None
+
+
+def test_clear_and_total_bytes_during_puts(cache):
+    stop = threading.Event()
+
+    def put_forever():
+        i = 0
+        while not stop.is_set():
+            cache.put(f"key{i % 20}", make_table())
+            i += 1
+
+    writer = threading.Thread(target=put_forever)
+    writer.start()
+    try:
+        for _ in range(200):
+            assert cache.total_bytes >= 0
+            cache.clear()
+    finally:
+        stop.set()
+        writer.join()
+    cache.clear()
+    assert cache.total_bytes == 0
+    assert os.listdir(cache.directory) == []
@@ -0,0 +1,65 @@
+# first party
+from schema import Query, normalize_sql
+
+
+def make_query(**kwargs) -> Query:
+    return Query.model_validate(kwargs)
+
+
+def test_normalize_sql_keeps_literals():
+    sql = "{{ Dimension('customer__region') }}  =\n 'North  America'"
+    assert (
+        normalize_sql(sql) == "{{ Dimension('customer__region') }} = 'North  America'"
+    )
+
+
+def test_canonical_ignores_order_duplicates_and_whitespace():
+    first = make_query(
+        metrics=[{"name": "revenue"}, {"name": "orders"}, {"name": "revenue"}],
+        groupBy=[{"name": "metric_time", "grain": "MONTH"}, {"name": "region"}],
+        where=[{"sql": "a = 1"}, {"sql": "b  =  2"}],
+    )
+    second = make_query(
+        metrics=[{"name": "orders"}, {"name": "revenue"}],
+        groupBy=[{"name": "region"}, {"name": "metric_time", "grain": "MONTH"}],
+        where=[{"sql": "b = 2"}, {"sql": "a = 1"}],
+    )
+    assert first.canonical() == second.canonical()
+    assert first.fingerprint == second.fingerprint
+    assert first.canonical().metric_names == ["orders", "revenue"]
+
+
+def test_canonical_keeps_order_by_order():
+    query = make_query(
+        metrics=[{"name": "revenue"}, {"name": "orders"}],
+        orderBy=[
+            {"metric": {"name": "revenue"}, "descending": True},
+            {"metric": {"name": "orders"}},
+            {"metric": {"name": "revenue"}, "descending": True},
+        ],
+    )
+    order_by = query.canonical().orderBy
+    assert [o.metric.name for o in order_by] == ["revenue", "orders"]
+
+
+def test_canonical_does_not_change_the_query():
+    query = make_query(metrics=[{"name": "revenue"}, {"name": "orders"}])
+    query.canonical()
+    assert query.metric_names == ["revenue", "orders"]
+
+
+def test_fingerprint_differs_for_different_queries():
+    base = {"metrics": [{"name": "revenue"}]}
+    fingerprints = {
+        make_query(**base).fingerprint,
+        make_query(**base, where=[{"sql": "year = 2023"}]).fingerprint,
+        make_query(**base, where=[{"sql": "year = 2024"}]).fingerprint,
+        make_query(
+            **base, groupBy=[{"name": "metric_time", "grain": "DAY"}]
+        ).fingerprint,
+        make_query(
+            **base, groupBy=[{"name": "metric_time", "grain": "WEEK"}]
+        ).fingerprint,
+        make_query(**base, limit=10).fingerprint,
+    }
+    assert len(fingerprints) == 6
@@ -0,0 +1,21 @@
+# third party
+import pytest
+
+pytest.importorskip("langchain_community")
+
+# first party
+from llm import semantic_layer_docs  # noqa: E402
+from llm.semantic_layer_docs import HashingEmbeddings, get_embeddings  # noqa: E402
+
+
+def test_default_falls_back_to_local_without_an_openai_key(monkeypatch):
+    monkeypatch.setattr(semantic_layer_docs, "EMBEDDINGS", "openai")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    assert isinstance(get_embeddings(), HashingEmbeddings)
+
+
+def test_default_uses_openai_with_a_key(monkeypatch):
+    monkeypatch.setattr(semantic_layer_docs, "EMBEDDINGS", "openai")
+    monkeypatch.setitem(semantic_layer_docs.EMBEDDING_BACKENDS, "openai", object)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    assert type(get_embeddings()) is object
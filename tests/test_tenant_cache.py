@@ -0,0 +1,102 @@
+# stdlib
+from concurrent.futures import Future
+
+# first party
+from tenant_cache import TenantCache
+
+
+def resolved(value) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def failed(exception: Exception) -> Future:
+    future = Future()
+    future.set_exception(exception)
+    return future
+
+
+class Loader:
+    def __init__(self):
+        self.calls = []
+        self.fail = False
+
+    def __call__(self, tenant, name) -> Future:
+        self.calls.append((tenant, name))
+        if self.fail:
+            return failed(RuntimeError("warehouse down"))
+        return resolved(f"{tenant}/{name}/{len(self.calls)}")
+
+
+def make_cache(loader, **kwargs) -> TenantCache:
+    kwargs.setdefault("size_of", lambda value: 10)
+    return TenantCache(loader, ["revenue", "orders"], **kwargs)
+
+
+def test_get_loads_once():
+    loader = Loader()
+    cache = make_cache(loader)
+    assert cache.get(1, "revenue").result() == "1/revenue/1"
+    assert cache.get(1, "revenue").result() == "1/revenue/1"
+    assert loader.calls == [(1, "revenue")]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["bytes"] == 10
+
+
+def test_expired_results_are_reloaded():
+    loader = Loader()
+    cache = make_cache(loader, ttl=-1)
+    cache.get(1, "revenue")
+    assert cache.peek(1, "revenue") is None
+    assert cache.get(1, "revenue").result() == "1/revenue/2"
+
+
+def test_failed_loads_are_not_cached():
+    loader = Loader()
+    loader.fail = True
+    cache = make_cache(loader)
+    assert cache.get(1, "revenue").exception() is not None
+    loader.fail = False
+    assert cache.get(1, "revenue").result() == "1/revenue/2"
+
+
+def test_least_recently_used_is_evicted():
+    cache = make_cache(Loader(), max_bytes=20)
+    cache.get(1, "revenue")
+    cache.get(2, "revenue")
+    cache.get(1, "revenue")
+    cache.get(3, "revenue")
+    assert cache.peek(1, "revenue") is not None
+    assert cache.peek(2, "revenue") is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 20
+
+
+def test_failed_refresh_keeps_the_old_result():
+    loader = Loader()
+    cache = make_cache(loader)
+    cache.get(1, "revenue")
+    loader.fail = True
+    cache.refresh(1, "revenue")
+    assert cache.peek(1, "revenue") == "1/revenue/1"
+    loader.fail = False
+    cache.refresh(1, "revenue")
+    assert cache.peek(1, "revenue") == "1/revenue/3"
+    assert cache.stats()["bytes"] == 10
+
+
+def test_warm_loads_active_tenants():
+    loader = Loader()
+    cache = make_cache(loader, should_warm=lambda tenant, name: name == "revenue")
+    cache.record_activity(1)
+    cache.warm(cache.active_tenants())
+    assert loader.calls == [(1, "revenue")]
+    cache.warm(cache.active_tenants())
+    assert loader.calls == [(1, "revenue")]
+
+
+def test_inactive_tenants_are_not_warmed():
+    cache = make_cache(Loader(), active_window=-1)
+    cache.record_activity(1)
+    assert cache.active_tenants() == []
@@ -6,88 +6,65 @@ import streamlit as st
 import streamlit.components.v1 as components
 
 # first party
-from client import get_connection_attributes, submit_request
-from helpers import url_for_disco
-from llm.semantic_layer_docs import create_chroma_db
-from queries import GRAPHQL_QUERIES
-
-
-def retrieve_saved_queries():
-    payload = {"query": GRAPHQL_QUERIES["saved_queries"]}
-    json_data = submit_request(st.session_state.conn, payload)
-    saved_queries = json_data.get("data", {}).get("savedQueries", [])
-    if saved_queries:
-        st.session_state.saved_queries = saved_queries
-
+from bootstrap import start_bootstrap, sync_bootstrap
+from catalog import (
+    apply_catalog,
+    fetch_catalog,
+    get_catalog_revalidator,
+    get_catalog_store,
+    sync_catalog,
+)
+from client import SemanticLayerError, get_connection_attributes
+from result_cache import environment_key
 
-def retrieve_account_id():
-    payload = {"query": GRAPHQL_QUERIES["account"], "variables": {"first": 1}}
-    host = url_for_disco()
 
-    # TODO: Temporary hack to get around multi-cell metadata URLs not conforming
-    try:
-        json_data = submit_request(
-            st.session_state.conn, payload, host_override=host, path="/beta/graphql"
-        )
-    except Exception as e:
-        print(f"Error running disco API query for {host}; {e}")
+def prepare_app():
+    conn = st.session_state.conn
+    # Saved queries and the account lookup run while the catalog loads
+    start_bootstrap(conn)
+    env = environment_key(conn)
+    if (
+        st.session_state.get("catalog_env") == env
+        and "metric_dict" in st.session_state
+    ):
+        # Loaded earlier in this session, `sync_catalog` applies newer versions
+        st.session_state.catalog_refresh = get_catalog_revalidator().revalidate(conn)
     else:
-        try:
-            edges = (
-                json_data.get("data", {})
-                .get("environment", {})
-                .get("applied", {})
-                .get("models", {})
-                .get("edges", [])
+        stored = get_catalog_store().load(conn)
+        if stored is not None:
+            # Serve the stored catalog right away and revalidate it in the background
+            metrics, content_hash = stored
+            st.session_state.catalog_refresh = get_catalog_revalidator().revalidate(
+                conn
             )
-        except AttributeError:
-            # data is None
-            pass
         else:
-            if edges:
-                st.session_state.account_id = edges[0]["node"]["accountId"]
-                st.session_state.project_id = edges[0]["node"]["projectId"]
-
-
-def prepare_app():
-
-    with st.spinner("Gathering Metrics..."):
-        payload = {"query": GRAPHQL_QUERIES["metrics"]}
-        json = submit_request(st.session_state.conn, payload)
-        try:
-            metrics = json["data"]["metrics"]
-        except TypeError:
-
-            # `data` is None and there may be an error
-            try:
-                error = json["errors"][0]["message"]
-                st.error(error)
-            except (KeyError, TypeError):
-                st.warning(
-                    "No metrics returned.  Ensure your project has metrics defined "
-                    "and a production job has been run successfully."
-                )
-        else:
-            create_chroma_db(metrics)
-            st.session_state.metric_dict = {m["name"]: m for m in metrics}
-            st.session_state.dimension_dict = {
-                dim["name"]: dim for metric in metrics for dim in metric["dimensions"]
-            }
-            for metric in st.session_state.metric_dict:
-                st.session_state.metric_dict[metric]["dimensions"] = [
-                    d["name"]
-                    for d in st.session_state.metric_dict[metric]["dimensions"]
-                ]
-            if not st.session_state.metric_dict:
-                # Query worked, but nothing returned
-                st.warning(
-                    "No Metrics returned!  Ensure your project has metrics defined "
-                    "and a production job has been run successfully."
-                )
-            else:
-                retrieve_saved_queries()
-                retrieve_account_id()
-                st.success("Success!  Explore the rest of the app!")
+            with st.spinner("Gathering Metrics..."):
+                try:
+                    metrics = fetch_catalog(conn)
+                except SemanticLayerError as e:
+                    if e.args[0] is not None:
+                        st.error(e.args[0])
+                    else:
+                        st.warning(
+                            "No metrics returned.  Ensure your project has metrics "
+                            "defined and a production job has been run successfully."
+                        )
+                    return
+
+                content_hash = get_catalog_store().save(conn, metrics)
+
+        if content_hash != st.session_state.get("catalog_hash"):
+            apply_catalog(metrics, content_hash)
+        st.session_state.catalog_env = env
+
+    if not st.session_state.metric_dict:
+        # Query worked, but nothing returned
+        st.warning(
+            "No Metrics returned!  Ensure your project has metrics defined "
+            "and a production job has been run successfully."
+        )
+    else:
+        st.success("Success!  Explore the rest of the app!")
 
 
 st.set_page_config(
@@ -120,10 +97,27 @@ jdbc_url = st.text_input(
     help="JDBC URL is found when configuring the semantic layer at the project level",
 )
 
+st.toggle(
+    label="Stream query results over Arrow Flight SQL",
+    value=False,
+    key="use_flight_sql",
+    help=(
+        "Fetch query results as Arrow record batches from the Flight SQL endpoint "
+        "in your JDBC URL instead of base64-encoded JSON from the GraphQL API"
+    ),
+)
+
 if st.session_state.jdbc_url != "":
-    st.cache_data.clear()
+    # Only a new environment or credentials invalidate cached API responses
+    if st.session_state.get("connected_jdbc_url") != st.session_state.jdbc_url:
+        st.cache_data.clear()
+        st.session_state.connected_jdbc_url = st.session_state.jdbc_url
     st.session_state.conn = get_connection_attributes(st.session_state.jdbc_url)
     if "conn" in st.session_state and st.session_state.conn is not None:
+        if st.session_state.use_flight_sql:
+            st.session_state.conn.result_transport = "flight"
+        sync_catalog()
+        sync_bootstrap()
         prepare_app()
 
 st.markdown(